@@ -0,0 +1,78 @@
+"""Store face embeddings as binary float32
+
+Revision ID: 3b9e1f6a2c47
+Revises: 7d6e5274f40e
+Create Date: 2026-10-18 10:12:41.180245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e1f6a2c47'
+down_revision: Union[str, Sequence[str], None] = '7d6e5274f40e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows converted per round trip, so large tables are never held in memory at once
+BATCH_SIZE = 500
+
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer()),
+    sa.column('face_embedding', sa.JSON()),
+    sa.column('face_embedding_f32', sa.LargeBinary()),
+)
+
+
+def _convert_in_batches(source, target, convert) -> None:
+    """Copies `source` into `target` for every non-null row, BATCH_SIZE rows at a time."""
+    conn = op.get_bind()
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam('row_id'))
+        .values({target.name: sa.bindparam('value')})
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, source)
+            .where(source.isnot(None), users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(update, [{'row_id': row[0], 'value': convert(row[1])} for row in rows])
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('face_embedding_f32', sa.LargeBinary(), nullable=True))
+    _convert_in_batches(
+        users.c.face_embedding, users.c.face_embedding_f32,
+        lambda embedding: np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+    )
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('face_embedding')
+        batch_op.alter_column('face_embedding_f32', new_column_name='face_embedding')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('face_embedding', new_column_name='face_embedding_f32')
+    op.add_column('users', sa.Column('face_embedding', sa.JSON(), nullable=True))
+    _convert_in_batches(
+        users.c.face_embedding_f32, users.c.face_embedding,
+        lambda data: np.frombuffer(data, dtype=EMBEDDING_DTYPE).tolist()
+    )
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('face_embedding_f32')
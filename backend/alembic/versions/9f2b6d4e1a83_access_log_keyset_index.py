@@ -0,0 +1,28 @@
+"""Composite (access_time, id) index for access log pagination
+
+Revision ID: 9f2b6d4e1a83
+Revises: e5a0c3f18d62
+Create Date: 2026-10-18 17:21:09.634118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2b6d4e1a83'
+down_revision: Union[str, Sequence[str], None] = 'e5a0c3f18d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_access_logs_access_time_id', 'access_logs', ['access_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_access_logs_access_time_id', table_name='access_logs')
@@ -0,0 +1,30 @@
+"""Add users.face_embedding_version
+
+Revision ID: b3e81f6c2d47
+Revises: d8c2a7f05b19
+Create Date: 2026-10-18 21:12:05.448310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e81f6c2d47'
+down_revision: Union[str, Sequence[str], None] = 'd8c2a7f05b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('face_embedding_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('face_embedding_version')
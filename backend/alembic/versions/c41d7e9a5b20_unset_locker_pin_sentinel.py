@@ -0,0 +1,41 @@
+"""Replace placeholder locker PIN hashes with the unset-PIN sentinel
+
+Revision ID: c41d7e9a5b20
+Revises: 3b9e1f6a2c47
+Create Date: 2026-10-18 14:31:07.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a5b20'
+down_revision: Union[str, Sequence[str], None] = '3b9e1f6a2c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.services.hashing.UNSET_HASH, copied so the migration doesn't change if the app does
+UNSET_HASH = '!'
+
+lockers = sa.table(
+    'lockers',
+    sa.column('pin_hash', sa.String()),
+    sa.column('is_active', sa.Boolean()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lockers are only activated by setting a PIN, so an inactive locker's hash is
+    # the random placeholder written at registration
+    op.execute(lockers.update().where(lockers.c.is_active == sa.false()).values(pin_hash=UNSET_HASH))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Nothing to restore: the placeholders were hashes of random values, and the
+    # sentinel is just as impossible to match
+    pass
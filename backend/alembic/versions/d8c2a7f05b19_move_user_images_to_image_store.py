@@ -0,0 +1,74 @@
+"""Move registration photos out of users.image_blob into the image store
+
+Revision ID: d8c2a7f05b19
+Revises: 9f2b6d4e1a83
+Create Date: 2026-10-18 19:40:52.301776
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.image_store import image_store
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8c2a7f05b19'
+down_revision: Union[str, Sequence[str], None] = '9f2b6d4e1a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows moved per round trip, so large tables are never held in memory at once
+BATCH_SIZE = 200
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer()),
+    sa.column('image_blob', sa.LargeBinary()),
+    sa.column('image_key', sa.String()),
+)
+
+
+def _move_in_batches(source, target, convert) -> None:
+    """Sets `target` to convert(`source`) for every row with a `source`, BATCH_SIZE rows at a time."""
+    conn = op.get_bind()
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam('row_id'))
+        .values({target.name: sa.bindparam('value')})
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, source)
+            .where(source.isnot(None), users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(update, [{'row_id': row[0], 'value': convert(row[1])} for row in rows])
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('image_key', sa.String(length=64), nullable=True))
+    # Files are written (atomically) before the transaction commits; if it doesn't,
+    # gc_images.py removes them
+    _move_in_batches(users.c.image_blob, users.c.image_key, image_store.put)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('image_blob')
+        batch_op.create_index(batch_op.f('ix_users_image_key'), ['image_key'], unique=False)
+    # SQLite only returns the freed pages to the filesystem after a VACUUM
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('users', sa.Column('image_blob', sa.BLOB(), nullable=True))
+    # The files stay in the image store; delete the directory once the downgrade is final
+    _move_in_batches(users.c.image_key, users.c.image_blob, image_store.read)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_image_key'))
+        batch_op.drop_column('image_key')
@@ -0,0 +1,42 @@
+"""Index users.status and add maintained per-status user counts
+
+Revision ID: e5a0c3f18d62
+Revises: c41d7e9a5b20
+Create Date: 2026-10-18 16:02:44.190735
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c3f18d62'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e9a5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_STATUSES = ('PENDING_APPROVAL', 'PENDING_PAYMENT', 'ACTIVE', 'REJECTED')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_users_status'), 'users', ['status'], unique=False)
+    counts = op.create_table(
+        'user_status_counts',
+        sa.Column('status', sa.Enum(*USER_STATUSES, name='userstatus'), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+
+    # Seeded from the current users, one row per status
+    users = sa.table('users', sa.column('status', sa.String()))
+    rows = dict(op.get_bind().execute(sa.select(users.c.status, sa.func.count()).group_by(users.c.status)).all())
+    op.bulk_insert(counts, [{'status': status, 'count': rows.get(status, 0)} for status in USER_STATUSES])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_status_counts')
+    op.drop_index(op.f('ix_users_status'), table_name='users')
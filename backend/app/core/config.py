@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -8,20 +10,82 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    PRINCIPAL_CACHE_SIZE: int = 1024 # Authenticated users kept in memory per process; 0 disables the cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30 # Also bounds how long a change made by another process goes unseen
+    PASSWORD_HASH_ROUNDS: int = 12 # bcrypt cost for passwords; existing hashes are upgraded on next login
+    PIN_HASH_ROUNDS: int = 12 # bcrypt cost for locker PINs; existing hashes are upgraded on next unlock
+    HASHING_WORKERS: int = 2 # Threads that may run bcrypt at the same time
 
     # --- Twilio SMS/OTP Configuration ---
     TWILIO_ACCOUNT_SID: str
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
     TWILIO_VERIFY_SID: str # For the OTP Verification service
+    SMS_BACKEND: str = "twilio" # "twilio", or "fake" to keep messages in-process (tests, load runs)
+    SMS_TIMEOUT_SECONDS: float = 5.0 # Per-request timeout for the SMS provider
+    SMS_MAX_RETRIES: int = 2 # Retries after a timeout, connection error, 429 or 5xx
+    SMS_POOL_SIZE: int = 20 # Max concurrent keep-alive connections to the provider
+    SMS_FAKE_LATENCY_MS: float = 0 # Simulated provider latency for the fake backend
 
     # --- Razorpay Payment Gateway Configuration ---
     RAZORPAY_KEY_ID: str
     RAZORPAY_KEY_SECRET: str
     RAZORPAY_WEBHOOK_SECRET: str # To secure your webhook endpoint
+    # Locker price per subscription plan, in paise (set as JSON in the environment to override)
+    LOCKER_PLAN_PRICES_PAISE: dict[str, int] = {"Basic": 500000, "Silver": 750000, "Gold": 1000000, "Platinum": 1500000}
+    APPROVAL_CONCURRENCY: int = 8 # Payment links / SMS created in parallel by a bulk approval
     
     ADMIN_EMAIL: str # <-- ADD THIS LINE
     ADMIN_PASSWORD: str # <-- ADD THIS LINE
+    USER_STATUS_COUNTERS: bool = False # Maintain per-status user counts so /admin/stats is O(1); run check_status_counts.py --repair after turning on
+
+    # --- Face Recognition Configuration ---
+    FACE_MATCH_THRESHOLD: float = 0.40 # Max cosine distance for a positive match
+    FACE_GALLERY_REFRESH_SECONDS: int = 300 # Re-sync the in-memory gallery with the DB after this long
+    FACE_GALLERY_MISS_RESYNC_SECONDS: float = 5 # On a failed match, re-sync and retry at most this often (picks up users activated by the job workers)
+    FACE_INDEX_TYPE: str = "exact" # "exact" (brute force) or "ivf" (approximate, for very large galleries)
+    FACE_INDEX_PATH: Optional[str] = None # If set, the gallery index is persisted to this file
+    FACE_IVF_NLIST: int = 1024 # Number of k-means lists for the IVF index
+    FACE_IVF_NPROBE: int = 16 # Lists scanned per query; higher means better recall but slower
+    FACE_IVF_RETRAIN_GROWTH: float = 2.0 # Retrain the IVF quantizer once the gallery grows by this factor
+
+    # --- Vision Worker Configuration ---
+    VISION_WORKERS: int = 0 # Processes for liveness/embedding work; 0 runs it in threads of the web process
+    FACE_MESH_POOL_SIZE: int = 4 # Warm FaceMesh graphs per vision process, i.e. concurrent sessions per process
+    FACE_MESH_POOL_TIMEOUT_SECONDS: float = 5.0 # Max wait for a free FaceMesh graph
+    LIVENESS_PASS_CONFIDENCE: int = 85 # Liveness score (0-100) a session needs to pass
+    LIVENESS_MIN_SECONDS: float = 1.0 # Minimum observation time before a session may pass early
+    LIVENESS_WINDOW_SECONDS: float = 3.0 # A session that hasn't passed by now fails
+    LIVENESS_HISTORY_FRAMES: int = 256 # Per-frame metrics kept per session (ring buffer; older frames are dropped)
+    LIVENESS_TEXTURE_EVERY_N: int = 3 # Run the Laplacian/skin texture metrics on every n-th face frame (1 = every frame)
+    LIVENESS_FRAME_BUDGET_MS: float = 0 # Defer texture metrics when landmark tracking already took this long; 0 disables
+    LIVENESS_MAX_TEXTURE_DEFERRALS: int = 3 # After this many deferrals in a row texture metrics run regardless of the budget
+    LIVENESS_ROI_SIZE: int = 128 # Face ROI is resized to this square before texture/skin metrics
+    VISION_REDUCED_DECODE: bool = True # Decode binary frames flagged landmarks-only at half resolution
+    EMBEDDING_SKIP_DETECTOR: bool = False # Embed the FaceMesh-located face crop on verify instead of re-detecting the face (enrolment still re-detects; validate the match threshold before enabling)
+    EMBEDDING_MAX_BATCH_SIZE: int = 8 # Max images per batched embedding forward pass
+    EMBEDDING_MAX_WAIT_MS: float = 20 # How long the first image of a batch waits for more to arrive
+
+    # --- Background Job Queue ---
+    JOB_QUEUE_PATH: str = "jobs.db" # SQLite file shared by the API and the job workers
+    JOB_WORKERS: int = 1 # Worker processes started with the API; 0 to run `python -m app.jobs.worker` separately
+    JOB_MAX_ATTEMPTS: int = 5 # Attempts before a job is dead-lettered
+    JOB_RETRY_BASE_SECONDS: float = 5.0 # Backoff before the first retry; doubles per attempt (with jitter)
+    JOB_LEASE_SECONDS: float = 300 # A running job is handed to another worker if its worker is silent this long
+    JOB_POLL_SECONDS: float = 1.0 # How often an idle worker checks for new jobs
+    JOB_RETENTION_DAYS: float = 30 # Finished jobs (and their dedup keys) are kept this long
+
+    # --- Access Logging ---
+    ACCESS_LOG_BATCH_SIZE: int = 200 # Buffered access logs are written as soon as this many are waiting
+    ACCESS_LOG_FLUSH_INTERVAL_MS: float = 1000 # ...or once the oldest has waited this long
+    ACCESS_LOG_MAX_BUFFERED: int = 10000 # While writes fail, entries beyond this many are dropped, oldest first
+
+    # --- Applicant Photos ---
+    IMAGE_STORE_PATH: str = "images" # Directory of the content-addressed registration photo store
+    IMAGE_GC_GRACE_SECONDS: int = 3600 # Unreferenced photos younger than this are kept (left for gc_images.py)
+    PHOTO_THUMBNAIL_CACHE_SIZE: int = 512 # Review thumbnails kept in memory (LRU)
+    PHOTO_THUMBNAIL_QUALITY: int = 80 # JPEG quality of review thumbnails
+    PHOTO_CACHE_MAX_AGE_SECONDS: int = 300 # Browser cache lifetime (Cache-Control: private) of a thumbnail
 
     class Config:
         # This tells Pydantic to load the variables from the .env file
@@ -1,22 +1,166 @@
-from sqlalchemy.orm import Session
+import base64
+from collections import Counter
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload
 from app import models
+from app.core.config import settings
+from app.models.user import AccessLog, User, UserStatus, UserStatusCount
+
+def count_users_by_status(db: Session) -> dict[UserStatus, int]:
+    """
+    Counts users per status in one grouped query (served by the users.status index).
+    """
+    rows = db.execute(select(User.status, func.count()).group_by(User.status))
+    return {status: count for status, count in rows}
+
+def get_status_counters(db: Session) -> dict[UserStatus, int]:
+    """
+    Reads the maintained per-status counts (one row per status).
+    """
+    rows = db.execute(select(UserStatusCount.status, UserStatusCount.count))
+    return {status: count for status, count in rows}
 
 def get_dashboard_stats(db: Session) -> dict:
     """
     Calculates statistics for the admin dashboard.
     """
-    pending_count = db.query(models.user.User).filter(models.user.User.status == models.user.UserStatus.PENDING_APPROVAL).count()
-    active_users_count = db.query(models.user.User).filter(models.user.User.status == models.user.UserStatus.ACTIVE).count()
-    total_users_count = db.query(models.user.User).count()
-    
+    if settings.USER_STATUS_COUNTERS:
+        counts = get_status_counters(db)
+    else:
+        counts = count_users_by_status(db)
+
     return {
-        "pending_count": pending_count,
-        "active_users_count": active_users_count,
-        "total_users_count": total_users_count,
+        "pending_count": counts.get(UserStatus.PENDING_APPROVAL, 0),
+        "active_users_count": counts.get(UserStatus.ACTIVE, 0),
+        "total_users_count": sum(counts.values()),
+    }
+
+def record_status_changes(db: Session, changes: Counter):
+    """
+    Applies per-status deltas ({status: +n/-n}) to the maintained counts, in the
+    caller's transaction so they commit or roll back with the change itself.
+    Does nothing unless USER_STATUS_COUNTERS is on.
+    """
+    if not settings.USER_STATUS_COUNTERS:
+        return
+    for status, delta in changes.items():
+        if not delta:
+            continue
+        # An atomic "count = count + delta", so concurrent writers never lose an update
+        result = db.execute(
+            update(UserStatusCount)
+            .where(UserStatusCount.status == status)
+            .values(count=UserStatusCount.count + delta)
+        )
+        if not result.rowcount:
+            db.add(UserStatusCount(status=status, count=delta))
+            db.flush()
+
+def record_status_change(db: Session, old_status: UserStatus | None, new_status: UserStatus | None):
+    """
+    Moves one user from `old_status` to `new_status` in the maintained counts
+    (None for a user being created or deleted).
+    """
+    changes = Counter()
+    if old_status is not None:
+        changes[old_status] -= 1
+    if new_status is not None:
+        changes[new_status] += 1
+    record_status_changes(db, changes)
+
+def check_status_counters(db: Session, repair: bool = False) -> dict:
+    """
+    Recounts users per status and compares the result with the maintained counts.
+    With `repair`, the counts are rewritten from the recount in one transaction.
+    """
+    counted = count_users_by_status(db)
+    stored = get_status_counters(db)
+    mismatches = {
+        status.value: {"counted": counted.get(status, 0), "stored": stored.get(status, 0)}
+        for status in UserStatus
+        if counted.get(status, 0) != stored.get(status, 0)
     }
 
+    if repair and mismatches:
+        # Recounted after the delete has taken the write lock, so no status change
+        # can slip in between the count and the rewrite
+        db.execute(delete(UserStatusCount))
+        counted = count_users_by_status(db)
+        db.add_all(UserStatusCount(status=status, count=counted.get(status, 0)) for status in UserStatus)
+        db.commit()
+
+    return {"consistent": not mismatches, "mismatches": mismatches, "repaired": bool(repair and mismatches)}
+
+# Only the user columns an access log response shows, not the image or embedding
+_LOG_USER = joinedload(AccessLog.user).load_only(User.id, User.full_name, User.email)
+
 def get_access_logs(db: Session, skip: int = 0, limit: int = 100) -> list[models.user.AccessLog]:
     """
     Retrieves a paginated list of all access logs, ordered by most recent.
     """
-    return db.query(models.user.AccessLog).order_by(models.user.AccessLog.access_time.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+    return db.query(AccessLog).options(_LOG_USER).order_by(AccessLog.access_time.desc(), AccessLog.id.desc()).offset(skip).limit(limit).all()
+
+def encode_log_cursor(log_time: datetime, log_id: int) -> str:
+    """
+    An opaque cursor for the position right after the given log.
+    """
+    return base64.urlsafe_b64encode(f"{log_time.isoformat()}|{log_id}".encode()).decode()
+
+def decode_log_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    The (access_time, id) position of a cursor; raises ValueError for a malformed one.
+    """
+    try:
+        log_time, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(log_time), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def get_access_logs_page(db: Session, cursor: str | None = None, limit: int = 100) -> tuple[list[AccessLog], str | None]:
+    """
+    One page of access logs, newest first, starting after `cursor`, and the cursor of
+    the next page (None on the last one). Each page is an index range scan on
+    (access_time, id), so deep pages cost the same as the first.
+    """
+    query = db.query(AccessLog).options(_LOG_USER)
+    if cursor:
+        query = query.filter(tuple_(AccessLog.access_time, AccessLog.id) < decode_log_cursor(cursor))
+    logs = query.order_by(AccessLog.access_time.desc(), AccessLog.id.desc()).limit(limit + 1).all()
+
+    if len(logs) <= limit:
+        return logs, None
+    logs = logs[:limit]
+    return logs, encode_log_cursor(logs[-1].access_time, logs[-1].id)
+
+def iter_access_log_rows(
+    db: Session, since: datetime | None = None, until: datetime | None = None, page_size: int = 1000
+) -> Iterator[list[tuple]]:
+    """
+    Streams access logs oldest first as pages of (id, access_time, status, user_id,
+    full_name, email) tuples, for exports. Rows are plain tuples fetched one keyset
+    page at a time, so memory stays flat however many logs there are.
+    """
+    query = (
+        select(AccessLog.id, AccessLog.access_time, AccessLog.status, User.id, User.full_name, User.email)
+        .join(User, AccessLog.user_id == User.id)
+        .order_by(AccessLog.access_time, AccessLog.id)
+        .limit(page_size)
+    )
+    if since:
+        query = query.where(AccessLog.access_time >= since)
+    if until:
+        query = query.where(AccessLog.access_time < until)
+
+    position = None
+    while True:
+        page_query = query if position is None else query.where(tuple_(AccessLog.access_time, AccessLog.id) > position)
+        rows = [tuple(row) for row in db.execute(page_query)]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        position = (rows[-1][1], rows[-1][0])
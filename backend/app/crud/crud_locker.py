@@ -1,8 +1,7 @@
 from sqlalchemy.orm import Session
-import random
 
 from app import models
-from app.security import get_password_hash, verify_password
+from app.services.hashing import PIN, UNSET_HASH, credential_hasher
 
 def create_user_locker(
     db: Session, 
@@ -16,13 +15,12 @@ def create_user_locker(
     # Generate a unique locker number. A real system might have a pool of available numbers.
     locker_number = f"A-{1000 + user.id}"
 
-    # The user will set their real PIN after activation. This is a secure placeholder.
-    placeholder_pin = get_password_hash(str(random.getrandbits(128)))
-
+    # The user will set their real PIN after activation. Until then the PIN hash is a
+    # sentinel that never verifies (no need to spend a bcrypt hash on a random value).
     db_locker = models.user.Locker(
         user_id=user.id,
         locker_number=locker_number,
-        pin_hash=placeholder_pin,
+        pin_hash=UNSET_HASH,
         subscription_plan=subscription_plan,
         tenure_years=tenure_years,
         is_active=False # Locker becomes active after payment and PIN set
@@ -32,6 +30,12 @@ def create_user_locker(
     db.refresh(db_locker)
     return db_locker
 
+def is_pin_set(locker: models.user.Locker | None) -> bool:
+    """
+    Whether the locker's owner has chosen a PIN.
+    """
+    return locker is not None and locker.pin_hash != UNSET_HASH
+
 def set_locker_pin(db: Session, user: models.user.User, pin: str) -> models.user.Locker:
     """
     Updates the user's locker with a new, hashed PIN.
@@ -40,7 +44,7 @@ def set_locker_pin(db: Session, user: models.user.User, pin: str) -> models.user
         # This case should ideally not be reached if the application flow is correct
         raise ValueError("User does not have a locker assigned.")
     
-    hashed_pin = get_password_hash(pin)
+    hashed_pin = credential_hasher.hash_sync(PIN, pin)
     user.locker.pin_hash = hashed_pin
     user.locker.is_active = True # The locker is now fully active
     db.commit()
@@ -51,17 +55,12 @@ def verify_locker_pin(db: Session, user: models.user.User, pin: str) -> bool:
     """
     Verifies if the provided plain-text PIN matches the user's stored hashed PIN.
     """
-    if not user.locker or not user.locker.pin_hash:
+    if not is_pin_set(user.locker):
         return False
-    
-    return verify_password(pin, user.locker.pin_hash)
 
-def create_access_log(db: Session, user: models.user.User) -> models.user.AccessLog:
-    """
-    Creates a new AccessLog entry for a user upon successful locker unlock.
-    """
-    db_log = models.user.AccessLog(user_id=user.id, status="SUCCESS")
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    return db_log
\ No newline at end of file
+    is_valid, new_hash = credential_hasher.verify_and_update_sync(PIN, pin, user.locker.pin_hash)
+    if new_hash:
+        # Hashed with an old cost setting; store it again with the current one
+        user.locker.pin_hash = new_hash
+        db.commit()
+    return is_valid
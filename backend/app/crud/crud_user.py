@@ -1,17 +1,27 @@
 import base64
-from sqlalchemy.orm import Session
+import binascii
+from collections import Counter
+from typing import Iterator
 
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.config import settings
 # Import the specific models and schemas needed
 from app.models.user import User,UserStatus
 from app.schemas.user import UserCreate
-from app.security import get_password_hash
 # --- ADD THIS IMPORT ---
 # Import the locker creation function
-from app.crud import crud_locker
+from app.crud import crud_locker, crud_admin
 # --- END ADDITION ---
 
 # --- ADD THESE IMPORTS ---
-from app.services import face_service
+from app.services import face_service, face_gallery
+from app.services.image_store import image_store
+from app.services.hashing import PASSWORD, credential_hasher
+from app.services.principal_cache import Principal, principal_cache
+from app.services.embedding_codec import embedding_from_bytes, embedding_to_bytes, embeddings_from_bytes
 
 
 def get_user_by_email(db: Session, email: str) -> User | None:
@@ -20,6 +30,14 @@ def get_user_by_email(db: Session, email: str) -> User | None:
     """
     return db.query(User).filter(User.email == email).first()
 
+def get_principal_by_email(db: Session, email: str) -> Principal | None:
+    """
+    Retrieves the slim projection of a user that authentication needs, by email.
+    Only those columns are fetched, not the image or embedding.
+    """
+    row = db.query(User.id, User.email, User.full_name, User.phone_number, User.status).filter(User.email == email).first()
+    return Principal(*row) if row else None
+
 # --- ADD THIS NEW FUNCTION ---
 def get_user_by_id(db: Session, user_id: int) -> User | None:
     """
@@ -29,37 +47,95 @@ def get_user_by_id(db: Session, user_id: int) -> User | None:
 # --- END NEW FUNCTION ---
 
 
+def get_users_by_ids(db: Session, user_ids: list[int]) -> list[User]:
+    """
+    Retrieves several users by ID in one query, with their lockers.
+    """
+    return db.query(User).options(joinedload(User.locker)).filter(User.id.in_(user_ids)).all()
+
+
 # --- ADD THIS NEW FUNCTION ---
 def get_users_by_status(db: Session, status: UserStatus) -> list[User]:
     """
-    Retrieves all users from the database who have a specific status.
+    Retrieves all users from the database who have a specific status, with their
+    lockers and nominees (the image and embedding columns are deferred).
+    """
+    return db.query(User).options(selectinload(User.locker), selectinload(User.nominees)).filter(User.status == status).all()
+
+def get_user_image_key(db: Session, user_id: int) -> str | None:
+    """
+    The image store key of the user's registration photo, if they still have one.
+    """
+    return db.scalar(select(User.image_key).where(User.id == user_id))
+
+def get_referenced_image_keys(db: Session, image_keys: list[str]) -> set[str]:
+    """
+    Which of the given image keys some user still refers to.
+    """
+    return set(db.scalars(select(User.image_key).where(User.image_key.in_(image_keys))))
+
+def delete_image_if_unreferenced(db: Session, image_key: str):
+    """
+    Removes a photo from the image store once no user refers to it (identical
+    photos are stored once, so another user may share it). A photo stored within
+    IMAGE_GC_GRACE_SECONDS is left for gc_images.py: a registration of the same
+    photo may not have committed yet.
     """
-    return db.query(User).filter(User.status == status).all()
+    if not get_referenced_image_keys(db, [image_key]):
+        image_store.delete(image_key, min_age_seconds=settings.IMAGE_GC_GRACE_SECONDS)
 # --- END NEW FUNCTION ---
 
 
-# backend/app/crud/crud_user.py
+def _active_face_embeddings_filter():
+    return (User.face_embedding.isnot(None), User.status == UserStatus.ACTIVE)
 
-# ... (imports and other functions like get_user_by_id) ...
 
-# --- ADD THIS NEW FUNCTION ---
-def update_user_status(db: Session, user: User, new_status: UserStatus) -> User:
+def get_active_face_embedding_versions(db: Session) -> dict[int, int]:
     """
-    Updates the status of a given user.
+    Returns {user id: face_embedding_version} for all active users that have a
+    stored face embedding.
     """
-    user.status = new_status
-    db.commit()
-    db.refresh(user)
-    return user
-# --- END NEW FUNCTION ---
+    return dict(db.query(User.id, User.face_embedding_version).filter(*_active_face_embeddings_filter()).all())
+
+
+def iter_active_face_embeddings(
+    db: Session,
+    user_ids: list[int] | None = None,
+    chunk_size: int = 1000
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Streams the face embeddings of active users as (ids, embeddings) chunks.
+    Only the id and embedding columns are fetched, not full User rows.
+    """
+    query = select(User.id, User.face_embedding).where(*_active_face_embeddings_filter())
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+
+    result = db.execute(query.order_by(User.id).execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        yield ids, embeddings_from_bytes([row[1] for row in rows])
+
+
+def decode_image_data_url(image_base64: str) -> bytes:
+    """
+    The image bytes of a "data:...;base64,..." URL; raises ValueError if there are none.
+    """
+    try:
+        image_data = base64.b64decode(image_base64.split(',')[1])
+    except (IndexError, binascii.Error) as e:
+        raise ValueError("Image is not a valid base64 data URL") from e
+    if not image_data:
+        raise ValueError("Image is empty")
+    return image_data
 
-# ... (rest of the file)
 def create_user(db: Session, user: UserCreate) -> User:
     """
     Creates a new user record in the database.
+    Raises ValueError if the image is missing or not valid base64.
     """
-    # Decode the Base64 image and store it as a BLOB
-    image_data = base64.b64decode(user.image_base64.split(',')[1])
+    # Decode the Base64 image and keep it in the image store; the row only holds its key
+    image_data = decode_image_data_url(user.image_base64)
 
     db_user = User(
         email=user.email,
@@ -68,9 +144,11 @@ def create_user(db: Session, user: UserCreate) -> User:
         bank_account_no=user.bank_account_no,
         ifsc_code=user.ifsc_code,
         branch_name=user.branch_name,
-        image_blob=image_data,
+        image_key=image_store.put(image_data),
+        status=UserStatus.PENDING_APPROVAL,
     )
     db.add(db_user)
+    crud_admin.record_status_change(db, None, db_user.status)
     db.commit()
     db.refresh(db_user)
     
@@ -92,35 +170,84 @@ import string
 
 def update_user_status(db: Session, user: User, new_status: UserStatus) -> User:
     """Updates the status of a user in the database."""
+    crud_admin.record_status_change(db, user.status, new_status)
     user.status = new_status
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
+
+    # Only ACTIVE users can be matched at the locker
+    if new_status == UserStatus.ACTIVE and user.face_embedding is not None:
+        face_gallery.gallery.upsert(user.id, embedding_from_bytes(user.face_embedding), user.face_embedding_version)
+    elif new_status != UserStatus.ACTIVE:
+        face_gallery.gallery.remove(user.id)
     return user
 
+def update_users_status(db: Session, users: list[User], new_status: UserStatus) -> list[User]:
+    """Updates the status of several users in one transaction."""
+    changes = Counter()
+    for user in users:
+        changes[user.status] -= 1
+        changes[new_status] += 1
+        user.status = new_status
+    crud_admin.record_status_changes(db, changes)
+    db.commit()
+
+    embeddings = {}
+    if new_status == UserStatus.ACTIVE:
+        # One query for all the (deferred) embeddings rather than one per user
+        embeddings = {
+            user_id: (embedding, version)
+            for user_id, embedding, version in db.execute(
+                select(User.id, User.face_embedding, User.face_embedding_version)
+                .where(User.id.in_([user.id for user in users]), User.face_embedding.isnot(None))
+            )
+        }
+    for user in users:
+        principal_cache.invalidate(user.email)
+        if user.id in embeddings:
+            embedding, version = embeddings[user.id]
+            face_gallery.gallery.upsert(user.id, embedding_from_bytes(embedding), version)
+        elif new_status != UserStatus.ACTIVE:
+            face_gallery.gallery.remove(user.id)
+    return users
+
 def set_temporary_password(db: Session, user: User) -> str:
     """Generates a random password, hashes it, saves it to the DB, and returns the plain text version."""
     alphabet = string.ascii_letters + string.digits
     temp_password = ''.join(secrets.choice(alphabet) for i in range(8))
     
-    user.password_hash = get_password_hash(temp_password)
+    user.password_hash = credential_hasher.hash_sync(PASSWORD, temp_password)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user.email)
     
     # Return the plain text password to be sent via SMS
     return temp_password
     
+def update_password_hash(db: Session, user: User, password_hash: str):
+    """Stores a re-computed hash of the user's current password (e.g. after a cost change)."""
+    user.password_hash = password_hash
+    db.commit()
+    
 def finalize_face_embedding(db: Session, user: User):
     """
-    Retrieves the user's stored image blob, generates a face embedding,
-    saves the embedding, and deletes the original image blob.
+    Retrieves the user's stored image, generates a face embedding,
+    saves the embedding, and deletes the original image.
     """
-    if user.image_blob:
-        embedding = face_service.generate_embedding(user.image_blob)
+    if user.image_key:
+        with image_store.mapped(user.image_key) as image:
+            embedding = face_service.generate_embedding(image)
         if embedding:
-            user.face_embedding = embedding
-            user.image_blob = None # Clear the original image for privacy and to save space
+            image_key = user.image_key
+            user.face_embedding = embedding_to_bytes(embedding)
+            user.face_embedding_version = User.face_embedding_version + 1
+            user.image_key = None # Clear the original image for privacy and to save space
             db.commit()
+            delete_image_if_unreferenced(db, image_key)
             db.refresh(user)
+            if user.status == UserStatus.ACTIVE:
+                face_gallery.gallery.upsert(user.id, embedding, user.face_embedding_version)
             print(f"Face embedding generated and stored for user {user.email}")
         else:
             print(f"Could not generate face embedding for user {user.email}")
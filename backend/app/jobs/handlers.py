@@ -0,0 +1,73 @@
+from app.crud import crud_user
+from app.database.session import SessionLocal
+from app.jobs.queue import PermanentJobError, job_queue
+from app.models.user import UserStatus
+from app.services import sms_service
+from app.services.image_store import image_store
+
+# Job kinds
+PAYMENT_CAPTURED = "payment_captured"
+FINALIZE_FACE_EMBEDDING = "finalize_face_embedding"
+
+# Each worker process runs one job at a time, so the blocking DB and DeepFace calls
+# below only hold up that worker, never the API's event loop.
+
+
+async def handle_payment_captured(payload: dict):
+    """
+    Activates a user whose payment went through and sends them a temporary password.
+    The face embedding is a job of its own, so retrying it never sends another password.
+    """
+    email = payload["email"]
+    db = SessionLocal()
+    try:
+        db_user = crud_user.get_user_by_email(db, email=email)
+        if not db_user:
+            raise PermanentJobError(f"Payment captured for non-existent user: {email}")
+
+        # ACTIVE is set last, so it also marks the password as delivered: a retry
+        # after a failed SMS issues a new password, and a replay of a finished job sends nothing
+        if db_user.status == UserStatus.ACTIVE:
+            print(f"User {email} is already active; not issuing another temporary password.")
+        else:
+            temp_password = crud_user.set_temporary_password(db, user=db_user)
+            sent = await sms_service.send_sms(
+                phone_number=db_user.phone_number,
+                message=f"Payment successful! Your LockSafe temporary password is: {temp_password}"
+            )
+            if not sent:
+                raise RuntimeError(f"Could not send the temporary password to {db_user.phone_number}")
+            crud_user.update_user_status(db, user=db_user, new_status=UserStatus.ACTIVE)
+            print(f"User {email} successfully activated.")
+
+        job_queue.enqueue(FINALIZE_FACE_EMBEDDING, f"embedding:{db_user.id}", {"user_id": db_user.id})
+    finally:
+        db.close()
+
+
+async def handle_finalize_face_embedding(payload: dict):
+    """
+    Generates and stores the user's face embedding, then deletes the original image.
+    """
+    db = SessionLocal()
+    try:
+        db_user = crud_user.get_user_by_id(db, user_id=payload["user_id"])
+        if not db_user:
+            raise PermanentJobError(f"User {payload['user_id']} no longer exists")
+        if db_user.face_embedding is not None and db_user.image_key is None:
+            return  # already done by an earlier attempt
+        if not db_user.image_key or not image_store.exists(db_user.image_key):
+            raise PermanentJobError(f"User {db_user.email} has no image to embed")
+
+        crud_user.finalize_face_embedding(db, user=db_user)
+        if db_user.face_embedding is None:
+            # DeepFace found no face; the image won't improve on a retry
+            raise PermanentJobError(f"No face found in the image of user {db_user.email}")
+    finally:
+        db.close()
+
+
+HANDLERS = {
+    PAYMENT_CAPTURED: handle_payment_captured,
+    FINALIZE_FACE_EMBEDDING: handle_finalize_face_embedding,
+}
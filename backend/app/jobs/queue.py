@@ -0,0 +1,232 @@
+import json
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+# Job states: queued -> running -> done, or back to queued for a retry, or dead once
+# the attempts are used up (or the failure is permanent). Dead jobs stay for inspection.
+QUEUED, RUNNING, DONE, DEAD = "queued", "running", "done", "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    lease_owner TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at);
+"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job is dead-lettered right away."""
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    key: str
+    payload: dict
+    attempts: int
+    lease_owner: str  # token of this claim; a stale worker can't finish a re-claimed job
+
+
+class JobQueue:
+    """
+    A durable job queue in a local SQLite file, shared by the API and the job workers.
+
+    Every job has a unique `key`, so enqueueing the same work twice (e.g. a webhook
+    that the provider delivers again) is a no-op. A worker claims a job with a lease;
+    if the worker dies, the job becomes claimable again once the lease runs out.
+    Failed jobs are retried with jittered exponential backoff, and dead-lettered
+    after `max_attempts`.
+    """
+    def __init__(self, path: str, lease_seconds: float, max_attempts: int, retry_base_seconds: float):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly where they are needed
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    # WAL lets the API enqueue while a worker holds a write transaction
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    self._add_lease_owner(conn)
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _add_lease_owner(conn: sqlite3.Connection):
+        # Queue files created before leases had owners
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, kind: str, key: str, payload: dict, delay_seconds: float = 0) -> bool:
+        """Adds a job. Returns False if a job with this key already exists."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, status, run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload), QUEUED, now + delay_seconds, now, now),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def claim(self) -> Job | None:
+        """
+        Takes the next due job (or one whose worker's lease has expired) and leases it.
+        """
+        now = time.time()
+        owner = secrets.token_hex(8)
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front, so two workers can't claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, kind, key, payload, attempts FROM jobs "
+                "WHERE (status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?) "
+                "ORDER BY run_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, lease_owner = ?, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, now + self.lease_seconds, owner, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return Job(row["id"], row["kind"], row["key"], json.loads(row["payload"]), row["attempts"] + 1, owner)
+
+    def complete(self, job: Job) -> bool:
+        """Marks the job done. False if its lease expired and another worker has claimed it."""
+        return self._update(job, status=DONE, lease_until=None, lease_owner=None, last_error=None)
+
+    def fail(self, job: Job, error: str, permanent: bool = False) -> str | None:
+        """
+        Schedules a retry, or dead-letters the job. Returns the job's new status, or
+        None if its lease expired and another worker has claimed it.
+        """
+        if permanent or job.attempts >= self.max_attempts:
+            status, fields = DEAD, {}
+        else:
+            # Full jitter, so jobs that failed together don't all retry together
+            delay = random.uniform(0, self.retry_base_seconds * 2 ** (job.attempts - 1))
+            status, fields = QUEUED, {"run_at": time.time() + delay}
+        if not self._update(job, status=status, lease_until=None, lease_owner=None, last_error=error, **fields):
+            return None
+        return status
+
+    def _update(self, job: Job, **fields) -> bool:
+        """Updates a job this worker still holds the lease on; False if it doesn't."""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND lease_owner = ?",
+                (*fields.values(), job.id, job.lease_owner),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def requeue(self, job_id: int) -> bool:
+        """Gives a dead job a fresh set of attempts. Returns False if it is not dead."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, now, now, job_id, DEAD),
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def dead_jobs(self, limit: int = 100) -> list[dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, kind, key, attempts, last_error, updated_at FROM jobs "
+                "WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def purge_done(self, older_than_seconds: float) -> int:
+        """
+        Deletes finished jobs older than the retention window. Their keys stop
+        deduplicating after that, so the window must outlast the provider's redeliveries.
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status = ? AND updated_at < ?",
+                (DONE, time.time() - older_than_seconds),
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def metrics(self) -> dict:
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = conn.execute("SELECT MIN(run_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            **{status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, DEAD)},
+            "oldest_queued_age_s": round(max(time.time() - oldest, 0), 1) if oldest is not None else None,
+        }
+
+
+# A single queue object per process; the file is what's shared between processes
+job_queue = JobQueue(
+    settings.JOB_QUEUE_PATH,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_base_seconds=settings.JOB_RETRY_BASE_SECONDS,
+)
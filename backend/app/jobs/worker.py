@@ -0,0 +1,148 @@
+"""
+Job worker processes for the durable job queue.
+
+The API starts JOB_WORKERS of them on startup. With JOB_WORKERS=0 they can run
+on their own instead (any number of them, against the same JOB_QUEUE_PATH):
+    python -m app.jobs.worker
+Dead-lettered jobs can be listed and retried with:
+    python -m app.jobs.worker --list-dead
+    python -m app.jobs.worker --requeue 42
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+
+from app.core.config import settings
+from app.jobs.handlers import HANDLERS
+from app.jobs.queue import PermanentJobError, job_queue
+from app.services.notification_client import notification_client
+
+# run_job() result for a job whose lease ran out before it finished
+LEASE_LOST = "lease_lost"
+
+# How often an idle worker deletes finished jobs past JOB_RETENTION_DAYS
+PURGE_INTERVAL_SECONDS = 3600
+
+
+async def run_job(job) -> str:
+    handler = HANDLERS.get(job.kind)
+    outcome = None
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind '{job.kind}'")
+        await handler(job.payload)
+    except PermanentJobError as e:
+        status = job_queue.fail(job, str(e), permanent=True)
+        outcome = f"dead-lettered: {e}"
+    except Exception as e:
+        status = job_queue.fail(job, repr(e))
+        outcome = f"failed on attempt {job.attempts}: {e!r} -> {status}"
+    else:
+        status = "done" if job_queue.complete(job) else None
+
+    if status is None:
+        print(f"Job {job.id} ({job.key}) outlived its lease and was claimed by another worker; result discarded")
+        return LEASE_LOST
+    if outcome:
+        print(f"Job {job.id} ({job.key}) {outcome}")
+    return status
+
+
+async def work(stop_event):
+    """Claims and runs jobs one at a time until `stop_event` is set."""
+    notification_client.start()
+    last_purge = 0.0
+    try:
+        while not stop_event.is_set():
+            job = job_queue.claim()
+            if job is None:
+                if time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                    job_queue.purge_done(settings.JOB_RETENTION_DAYS * 86400)
+                    last_purge = time.monotonic()
+                await asyncio.sleep(settings.JOB_POLL_SECONDS)
+                continue
+            await run_job(job)
+    finally:
+        await notification_client.aclose()
+
+
+def _worker_main(stop_event):
+    # The parent decides when workers stop; Ctrl+C in a terminal goes to the whole group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    print(f"Job worker {os.getpid()} started")
+    asyncio.run(work(stop_event))
+
+
+class JobWorkerPool:
+    """
+    Starts and stops the job worker processes of one API process. They are plain
+    processes rather than an executor: each one owns its polling loop, its DB
+    sessions and (once an embedding job comes) its own copy of the DeepFace model.
+    """
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = None
+        self._processes = []
+
+    def start(self):
+        if self.num_workers <= 0 or self._processes:
+            return
+        self._stop_event = self._context.Event()
+        for _ in range(self.num_workers):
+            process = self._context.Process(target=_worker_main, args=(self._stop_event,), daemon=True)
+            process.start()
+            self._processes.append(process)
+        print(f"Job worker pool started with {self.num_workers} processes")
+
+    def shutdown(self, timeout: float = 10.0):
+        """Lets running jobs finish (up to `timeout`); a job cut short is retried after its lease expires."""
+        if not self._processes:
+            return
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "alive": sum(process.is_alive() for process in self._processes),
+            **job_queue.metrics(),
+        }
+
+
+# A single, process-wide pool
+job_workers = JobWorkerPool(settings.JOB_WORKERS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list-dead", action="store_true", help="List dead-lettered jobs and exit")
+    parser.add_argument("--requeue", type=int, metavar="JOB_ID", help="Retry a dead-lettered job and exit")
+    args = parser.parse_args()
+
+    if args.list_dead:
+        for job in job_queue.dead_jobs():
+            print(f"{job['id']:>6}  {job['kind']:<24}{job['key']:<40}attempts={job['attempts']}  {job['last_error']}")
+        return
+    if args.requeue is not None:
+        requeued = job_queue.requeue(args.requeue)
+        print(f"Job {args.requeue} requeued" if requeued else f"Job {args.requeue} is not dead-lettered")
+        return
+
+    stop_event = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    print(f"Job worker {os.getpid()} started on {settings.JOB_QUEUE_PATH}")
+    asyncio.run(work(stop_event))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -6,19 +9,51 @@ from app.database.session import engine
 from app.models import user as user_models
 
 # Import all the routers from your application
-from app.routers import auth, admin, locker, webhooks
+from app.routers import auth, admin, locker, webhooks, health
 from app.websockets import vision_ws
+from app.jobs.worker import job_workers
+from app.services.access_log_writer import access_log_writer
+from app.services.embedding_engine import embedding_engine
+from app.services.notification_client import notification_client
+from app.vision.worker_pool import vision_pool
 
 # This command instructs SQLAlchemy to create all the database tables
 # based on the models defined in user_models.py. It will only create
 # tables that do not already exist.
 user_models.Base.metadata.create_all(bind=engine)
 
+# --- Startup / Shutdown ---
+# Long-lived resources (like the vision and job worker processes) are started once per
+# server process and released when it shuts down.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    vision_pool.start()
+    embedding_engine.start()
+    notification_client.start()
+    job_workers.start()
+    access_log_writer.start()
+    # Models warm up in the background; /api/health/ready reports when they are done
+    warm_up = asyncio.create_task(vision_pool.warm_up())
+    try:
+        yield
+    finally:
+        try:
+            warm_up.cancel()
+            await embedding_engine.stop()
+            await notification_client.aclose()
+            vision_pool.shutdown()
+            job_workers.shutdown()
+        finally:
+            # Buffered access logs are written even if another shutdown step failed
+            access_log_writer.close()
+
+
 # Initialize the FastAPI application
 app = FastAPI(
     title="LockSafe API",
     description="The backend API for the Smart Bank Locker System with Face Authentication.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- Middleware Setup ---
@@ -48,6 +83,8 @@ app.include_router(webhooks.router, prefix="/api", tags=["4. External Webhooks"]
 # WebSocket routers don't typically use the /api prefix
 app.include_router(vision_ws.router, tags=["5. Real-time Vision (WebSockets)"])
 
+app.include_router(health.router, prefix="/api", tags=["6. Health & Metrics"])
+
 
 # --- Root Endpoint ---
 # A simple endpoint to confirm that the API is running.
@@ -12,10 +12,11 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Enum,
+    Index,
     BLOB,
-    JSON
+    LargeBinary
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 # Import the Base class from your database session setup
 from app.database.session import Base
@@ -43,18 +44,22 @@ class User(Base):
     phone_number = Column(String(20), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=True) # Nullable until activated
     
-    # Use JSON to store the list of numbers for the vector embedding
-    face_embedding = Column(JSON, nullable=True) 
+    # Raw float32 bytes of the face embedding (see app.services.embedding_codec).
+    # Deferred: only loaded when accessed, not with every User row
+    face_embedding = deferred(Column(LargeBinary, nullable=True))
+    # Bumped on every write of face_embedding, so the face gallery can spot changed rows
+    face_embedding_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     bank_account_no = Column(String(50), nullable=False)
     ifsc_code = Column(String(20), nullable=False)
     branch_name = Column(String(100), nullable=False)
 
-    status = Column(Enum(UserStatus), default=UserStatus.PENDING_APPROVAL, nullable=False)
+    status = Column(Enum(UserStatus), default=UserStatus.PENDING_APPROVAL, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # BLOB to temporarily store the image for admin review
-    image_blob = Column(BLOB, nullable=True)
+    # Key of the registration photo in the image store (app.services.image_store),
+    # kept for admin review until the face embedding has been generated
+    image_key = Column(String(64), nullable=True, index=True)
 
     # --- Relationships ---
     # `back_populates` creates a two-way link between the related models
@@ -64,6 +69,17 @@ class User(Base):
     access_logs = relationship("AccessLog", back_populates="user", cascade="all, delete-orphan")
 
 
+class UserStatusCount(Base):
+    """
+    Number of users per status, kept in step by crud_user when USER_STATUS_COUNTERS
+    is on, so the dashboard doesn't have to count the users table.
+    """
+    __tablename__ = "user_status_counts"
+
+    status = Column(Enum(UserStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
 class Locker(Base):
     __tablename__ = "lockers"
 
@@ -106,4 +122,7 @@ class AccessLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     # --- Relationship ---
-    user = relationship("User", back_populates="access_logs")
\ No newline at end of file
+    user = relationship("User", back_populates="access_logs")
+
+    # Serves keyset pagination and exports, which walk logs in (access_time, id) order
+    __table_args__ = (Index("ix_access_logs_access_time_id", "access_time", "id"),)
\ No newline at end of file
@@ -1,6 +1,13 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud, models
 from app.schemas import user as user_schemas # Import the user module from schemas
@@ -9,13 +16,17 @@ from app.database.session import SessionLocal
 # It would verify the JWT and check if the user has an 'admin' role.
 from app.security import get_current_admin_user 
 from app.services import payment_service, sms_service
+from app.services.principal_cache import Principal
+from app.services.image_store import image_store
+from app.services.thumbnails import render_thumbnail, thumbnail_cache
 
 router = APIRouter()
 
 # Add OAuth2PasswordRequestForm to your imports at the top
 from fastapi.security import OAuth2PasswordRequestForm
 # Add security functions to your imports
-from app.security import verify_password, create_access_token
+from app.security import create_access_token
+from app.services.hashing import PASSWORD, credential_hasher
 from app.schemas.user import Token # Import the Token schema
 from app.core.config import settings
 from datetime import timedelta
@@ -38,13 +49,17 @@ def admin_login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestF
     admin_user = crud_user.get_user_by_email(db, email=form_data.username)
 
     # Check if the user is the designated admin and password is correct
-    if (not admin_user or 
-        admin_user.email != settings.ADMIN_EMAIL or 
-        not verify_password(form_data.password, admin_user.password_hash)):
+    is_admin = admin_user is not None and admin_user.email == settings.ADMIN_EMAIL
+    is_valid, new_hash = credential_hasher.verify_and_update_sync(
+        PASSWORD, form_data.password, admin_user.password_hash if is_admin else None
+    )
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect admin credentials"
         )
+    if new_hash:
+        crud_user.update_password_hash(db, user=admin_user, password_hash=new_hash)
     
     access_token = create_access_token(data={"sub": admin_user.email})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -54,7 +69,7 @@ def admin_login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestF
 @router.get("/admin/pending-requests", response_model=List[user_schemas.User])
 def get_pending_applications(
     db: Session = Depends(get_db),
-    current_admin: models.user.User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ):
     """
     Retrieves a list of all user applications with 'PENDING_APPROVAL' status.
@@ -63,11 +78,69 @@ def get_pending_applications(
     pending_users = crud_user.get_users_by_status(db, status= models.user.UserStatus.PENDING_APPROVAL)
     return pending_users
 
+def _photo_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": f"private, max-age={settings.PHOTO_CACHE_MAX_AGE_SECONDS}"}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    return bool(if_none_match) and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+def _applicant_image_key(db: Session, user_id: int) -> str:
+    image_key = crud_user.get_user_image_key(db, user_id)
+    if not image_key or not image_store.exists(image_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No photo found for this applicant.")
+    return image_key
+
+@router.get("/admin/applicants/{user_id}/photo")
+def get_applicant_photo(
+    user_id: int,
+    size: int = Query(256, ge=32, le=1024),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """
+    An applicant's registration photo as a JPEG whose longer side is at most `size`
+    pixels, for the review queue. Thumbnails are cached, and answer 304 to a
+    matching If-None-Match.
+    """
+    image_key = _applicant_image_key(db, user_id)
+    # Stored images never change, so the key and size identify the thumbnail
+    etag = f'"{image_key}-{size}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_photo_headers(etag))
+
+    thumbnail = thumbnail_cache.get(image_key, size)
+    if thumbnail is None:
+        with image_store.mapped(image_key) as image:
+            thumbnail = render_thumbnail(image, size, settings.PHOTO_THUMBNAIL_QUALITY)
+        if thumbnail is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No usable photo found for this applicant.")
+        thumbnail_cache.put(image_key, size, thumbnail)
+    return Response(content=thumbnail, media_type="image/jpeg", headers=_photo_headers(etag))
+
+@router.get("/admin/applicants/{user_id}/photo/original")
+def get_applicant_photo_original(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """
+    An applicant's registration photo as uploaded, streamed from the image store.
+    """
+    image_key = _applicant_image_key(db, user_id)
+    etag = f'"{image_key}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_photo_headers(etag))
+    return FileResponse(
+        image_store.path(image_key), media_type=image_store.media_type(image_key), headers=_photo_headers(etag)
+    )
+
 @router.put("/admin/approve/{user_id}", response_model=user_schemas.User)
 def approve_application(
     user_id: int,
     db: Session = Depends(get_db),
-    current_admin: models.user.User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ):
     """
     Approves a user's application.
@@ -95,23 +168,134 @@ def approve_application(
     # # 1. Update user status in the database
     # updated_user = crud.update_user_status(db, user=db_user, new_status=models.user.UserStatus.PENDING_PAYMENT)
     
-    # 2. Generate a payment link via Razorpay
-    # In a real app, you would get the amount from the user's chosen subscription plan
+    # 2. Generate a payment link via Razorpay, priced by the user's subscription plan
     payment_link = payment_service.create_payment_link(
-        amount=500000, # Example: 5000.00 INR in paise
+        amount=payment_service.plan_amount(updated_user.locker.subscription_plan),
         description=f"Payment for {updated_user.locker.subscription_plan.value} Locker Plan",
         user_email=updated_user.email,
         user_phone=updated_user.phone_number
     )
+    if not payment_link:
+        # Without a link the user could never pay, so the application goes back for approval
+        crud_user.update_user_status(db, user=updated_user, new_status=models.user.UserStatus.PENDING_APPROVAL)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Payment link could not be created; the application is still pending approval"
+        )
 
-    # 3. Send the payment link to the user via SMS
-    message = (
+    # 3. Send the payment link to the user via SMS (in the background; the response doesn't wait on it)
+    sms_service.dispatch_sms(phone_number=updated_user.phone_number, message=_payment_link_message(payment_link))
+    
+    return updated_user
+
+
+def _payment_link_message(payment_link: str) -> str:
+    return (
         f"Your LockSafe application has been approved! "
         f"Please complete your payment using this link: {payment_link}"
     )
-    sms_service.send_sms(phone_number=updated_user.phone_number, message=message)
-    
-    return updated_user
+
+
+def _approve_pending(db: Session, user_ids: list[int]) -> tuple[list[dict], dict]:
+    """
+    Moves every listed user that is pending approval to 'PENDING_PAYMENT' in one
+    transaction. Returns the approved applicants' contact details, and the results
+    of the ids that could not be approved.
+    """
+    users = {user.id: user for user in crud_user.get_users_by_ids(db, user_ids)}
+    approvable, rejected = [], {}
+    for user_id in user_ids:
+        user = users.get(user_id)
+        if not user:
+            detail = "User not found"
+        elif user.status != models.user.UserStatus.PENDING_APPROVAL:
+            detail = f"User is not pending approval. Current status: {user.status.value}"
+        elif not user.locker:
+            detail = "User has no locker application"
+        else:
+            approvable.append(user)
+            continue
+        rejected[user_id] = user_schemas.ApprovalResult(user_id=user_id, approved=False, detail=detail)
+
+    crud_user.update_users_status(db, users=approvable, new_status=models.user.UserStatus.PENDING_PAYMENT)
+    # Plain values, so the concurrent tasks below never touch the session
+    applicants = [
+        {"user_id": user.id, "email": user.email, "phone_number": user.phone_number,
+         "subscription_plan": user.locker.subscription_plan}
+        for user in approvable
+    ]
+    return applicants, rejected
+
+
+def _revert_to_pending_approval(db: Session, user_ids: list[int]):
+    """
+    Puts approved users that never got a payment link back to 'PENDING_APPROVAL',
+    so they show up for approval again instead of waiting for a payment that can't come.
+    """
+    users = [
+        user for user in crud_user.get_users_by_ids(db, user_ids)
+        if user.status == models.user.UserStatus.PENDING_PAYMENT
+    ]
+    crud_user.update_users_status(db, users=users, new_status=models.user.UserStatus.PENDING_APPROVAL)
+
+
+async def _send_payment_link(semaphore: asyncio.Semaphore, user_id: int, email: str, phone_number: str,
+                             subscription_plan) -> user_schemas.ApprovalResult:
+    """
+    Creates and texts one applicant's payment link. Never raises: a failure is
+    reported in the result, with `approved` False when no link was created.
+    """
+    async with semaphore:
+        try:
+            # The Razorpay SDK is blocking, so link creation runs in the threadpool
+            payment_link = await run_in_threadpool(
+                payment_service.create_payment_link,
+                amount=payment_service.plan_amount(subscription_plan),
+                description=f"Payment for {subscription_plan.value} Locker Plan",
+                user_email=email,
+                user_phone=phone_number
+            )
+        except Exception as e:
+            print(f"Error creating payment link for user {user_id}: {e}")
+            payment_link = None
+        if not payment_link:
+            return user_schemas.ApprovalResult(
+                user_id=user_id, approved=False,
+                detail="Payment link could not be created; the application is still pending approval"
+            )
+
+        try:
+            sms_sent = await sms_service.send_sms(phone_number=phone_number, message=_payment_link_message(payment_link))
+        except Exception as e:
+            print(f"Error sending payment link to {phone_number}: {e}")
+            sms_sent = False
+    return user_schemas.ApprovalResult(user_id=user_id, approved=True, payment_link=payment_link, sms_sent=sms_sent)
+
+
+@router.post("/admin/approve", response_model=user_schemas.BulkApproveResponse)
+async def approve_applications(
+    request: user_schemas.BulkApproveRequest,
+    db: Session = Depends(get_db),
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """
+    Approves several applications at once.
+    Statuses change in one transaction; payment links and SMS are then sent concurrently
+    (up to APPROVAL_CONCURRENCY at a time), and users whose link could not be created
+    go back to 'PENDING_APPROVAL'. Returns one result per requested user id.
+    Accessible only by an admin user.
+    """
+    user_ids = list(dict.fromkeys(request.user_ids))  # drop duplicates, keep order
+    applicants, results = await run_in_threadpool(_approve_pending, db, user_ids)
+
+    semaphore = asyncio.Semaphore(settings.APPROVAL_CONCURRENCY)
+    sent = await asyncio.gather(*(_send_payment_link(semaphore, **applicant) for applicant in applicants))
+    results.update((result.user_id, result) for result in sent)
+
+    unlinked = [result.user_id for result in sent if not result.approved]
+    if unlinked:
+        await run_in_threadpool(_revert_to_pending_approval, db, unlinked)
+    return {"results": [results[user_id] for user_id in user_ids]}
 
 # ... other imports ...
 # Update schema imports
@@ -124,7 +308,7 @@ from app.crud import crud_admin
 @router.get("/admin/stats", response_model=DashboardStats)
 def get_stats(
     db: Session = Depends(get_db),
-    current_admin: models.user.User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ):
     """
     Endpoint to retrieve statistics for the admin dashboard.
@@ -137,7 +321,7 @@ def get_user_access_logs(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_admin: models.user.User = Depends(get_current_admin_user)
+    current_admin: Principal = Depends(get_current_admin_user)
 ):
     """
     Endpoint to retrieve all user access logs with pagination.
@@ -145,4 +329,67 @@ def get_user_access_logs(
     logs = crud_admin.get_access_logs(db, skip=skip, limit=limit)
     return logs
 
+@router.get("/admin/access-logs/page", response_model=user_schemas.AccessLogPage)
+def get_access_logs_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """
+    Access logs, newest first, with cursor pagination: pass the returned next_cursor
+    to get the following page. Unlike skip/limit, deep pages are as fast as the first.
+    """
+    try:
+        logs, next_cursor = crud_admin.get_access_logs_page(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": logs, "next_cursor": next_cursor}
+
+ACCESS_LOG_EXPORT_COLUMNS = ["id", "access_time", "status", "user_id", "full_name", "email"]
+ACCESS_LOG_EXPORT_PAGE_SIZE = 1000
+
+def _export_access_logs(export_format: str, since: Optional[datetime], until: Optional[datetime]):
+    """
+    Yields the export one page of rows at a time. It runs after the endpoint has
+    returned, so it opens its own session rather than using the request's.
+    """
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(ACCESS_LOG_EXPORT_COLUMNS)
+        for rows in crud_admin.iter_access_log_rows(db, since=since, until=until, page_size=ACCESS_LOG_EXPORT_PAGE_SIZE):
+            rows = [(log_id, log_time.isoformat(), *rest) for log_id, log_time, *rest in rows]
+            if export_format == "csv":
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(json.dumps(dict(zip(ACCESS_LOG_EXPORT_COLUMNS, row))) + "\n" for row in rows)
+        if export_format == "csv" and buffer.tell():
+            yield buffer.getvalue()  # the header of an empty export
+    finally:
+        db.close()
+
+@router.get("/admin/access-logs/export")
+def export_access_logs(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_admin: Principal = Depends(get_current_admin_user)
+):
+    """
+    Streams every access log (optionally those in [since, until)) oldest first, as
+    NDJSON or CSV, without holding more than one page of rows in memory.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_access_logs(format, since, until),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="access_logs.{format}"'},
+    )
+
 # ... existing /admin/pending-requests and /admin/approve/{user_id} endpoints ...
\ No newline at end of file
@@ -11,7 +11,8 @@ from app import models, schemas
 
 from app.schemas.user import User, UserCreate, Token 
 from app.database.session import SessionLocal
-from app.security import create_access_token, verify_password
+from app.security import create_access_token
+from app.services.hashing import PASSWORD, credential_hasher
 from app.services import sms_service # <--- Add this import
 from pydantic import BaseModel
 
@@ -37,7 +38,7 @@ def get_db():
 
 # --- ADD THIS NEW ENDPOINT ---
 @router.post("/auth/send-otp")
-def send_otp(request: PhoneRequest):
+async def send_otp(request: PhoneRequest):
     phone = request.phone_number.strip()
     
     # Normalize phone number to E.164 format for Twilio
@@ -48,7 +49,7 @@ def send_otp(request: PhoneRequest):
     else:
         raise HTTPException(status_code=400, detail="Invalid phone number format.")
 
-    success = sms_service.send_otp(formatted_phone)
+    success = await sms_service.send_otp(formatted_phone)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to send OTP.")
     return {"message": "OTP sent successfully"}
@@ -56,9 +57,9 @@ def send_otp(request: PhoneRequest):
 
 # --- ADD THIS NEW ENDPOINT ---
 @router.post("/auth/verify-otp")
-def verify_otp(request: OtpVerifyRequest):
+async def verify_otp(request: OtpVerifyRequest):
     # (Normalization logic can be repeated here for verification if needed)
-    is_valid = sms_service.verify_otp(phone_number=request.phone_number, otp_code=request.otp)
+    is_valid = await sms_service.verify_otp(phone_number=request.phone_number, otp_code=request.otp)
     if not is_valid:
         raise HTTPException(status_code=400, detail="Invalid or expired OTP.")
     return {"message": "OTP verified successfully", "verified": True}
@@ -72,7 +73,10 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    new_user = crud_user.create_user(db=db, user=user)
+    try:
+        new_user = crud_user.create_user(db=db, user=user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     # --- END CHANGE ---
 
     return new_user
@@ -83,12 +87,17 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     # --- CHANGE IS HERE ---
     user = crud_user.get_user_by_email(db, email=form_data.username)
     # --- END CHANGE ---
-    if not user or not user.password_hash or not verify_password(form_data.password, user.password_hash):
+    is_valid, new_hash = credential_hasher.verify_and_update_sync(
+        PASSWORD, form_data.password, user.password_hash if user else None
+    )
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        crud_user.update_password_hash(db, user=user, password_hash=new_hash)
     
     access_token = create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from app.jobs.worker import job_workers
+from app.services.access_log_writer import access_log_writer
+from app.services.embedding_engine import embedding_engine
+from app.services.hashing import credential_hasher
+from app.services.notification_client import notification_client
+from app.services.principal_cache import principal_cache
+from app.services.thumbnails import thumbnail_cache
+from app.vision.worker_pool import vision_pool
+
+router = APIRouter()
+
+
+@router.get("/health/ready")
+def get_readiness(response: Response):
+    """
+    Readiness probe: 200 only once the FaceMesh graphs and the embedding model are warm
+    in every vision worker, 503 before that.
+    """
+    if not vision_pool.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"ready": False}
+    return {"ready": True, "warmup": vision_pool.warmup_timings}
+
+
+@router.get("/health/metrics")
+async def get_metrics():
+    """
+    Operational metrics for monitoring (pool sizes, wait times, notification delivery, job queue, access log buffer).
+    """
+    return {
+        "vision": await vision_pool.metrics(),
+        "embedding_batches": embedding_engine.metrics(),
+        "notifications": notification_client.metrics(),
+        "jobs": await run_in_threadpool(job_workers.metrics),
+        "principal_cache": principal_cache.metrics(),
+        "hashing": credential_hasher.metrics(),
+        "access_logs": access_log_writer.metrics(),
+        "thumbnails": thumbnail_cache.metrics(),
+    }
@@ -1,24 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app import crud, models
+from app import models
+from app.crud import crud_locker
 # Import the specific schemas you need from the user.py file
 from app.schemas.user import LockerSetPin, UnlockRequest
-from app.database.session import SessionLocal
 # NOTE: 'get_current_active_user' is a dependency from security.py that ensures
 # the user is logged in and their account status is 'ACTIVE'.
-from app.security import get_current_active_user
+from app.security import get_current_active_user, get_db
 from app.services import sms_service
+from app.services.access_log_writer import INVALID_OTP, INVALID_PIN, SUCCESS, access_log_writer
 
 router = APIRouter()
 
-# Dependency to get a DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# The DB session comes from the same get_db as get_current_active_user's, so FastAPI
+# hands both one session and current_user (and its locker) can be updated through it
 
 @router.post("/locker/set-pin", status_code=status.HTTP_200_OK)
 def set_locker_pin(
@@ -29,7 +26,7 @@ def set_locker_pin(
     """
     Allows an active user to set their 6-digit locker PIN for the first time.
     """
-    if current_user.locker and current_user.locker.pin_hash:
+    if crud_locker.is_pin_set(current_user.locker):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="PIN has already been set. Please use the reset PIN feature."
@@ -41,12 +38,12 @@ def set_locker_pin(
             detail="PIN must be a 6-digit number."
         )
 
-    crud.set_locker_pin(db=db, user=current_user, pin=pin_data.pin)
+    crud_locker.set_locker_pin(db=db, user=current_user, pin=pin_data.pin)
     
     return {"message": "Locker PIN set successfully."}
 
 @router.post("/locker/unlock", status_code=status.HTTP_200_OK)
-def unlock_locker(
+async def unlock_locker(
     unlock_data: UnlockRequest, # Assumes UnlockRequest schema exists
     db: Session = Depends(get_db),
     current_user: models.user.User = Depends(get_current_active_user)
@@ -56,20 +53,22 @@ def unlock_locker(
     Verifies the user's PIN and a one-time password (OTP) that was
     sent to their phone after a successful face verification.
     """
-    # 1. Verify the OTP
-    is_otp_valid = sms_service.verify_otp(
+    # 1. Verify the OTP (awaited, so the provider round trip holds no worker thread)
+    is_otp_valid = await sms_service.verify_otp(
         phone_number=current_user.phone_number, 
         otp_code=unlock_data.otp
     )
     if not is_otp_valid:
+        access_log_writer.record(current_user.id, INVALID_OTP)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired OTP.")
 
     # 2. Verify the Locker PIN
-    is_pin_valid = crud.verify_locker_pin(db=db, user=current_user, pin=unlock_data.pin)
+    is_pin_valid = await run_in_threadpool(crud_locker.verify_locker_pin, db=db, user=current_user, pin=unlock_data.pin)
     if not is_pin_valid:
+        access_log_writer.record(current_user.id, INVALID_PIN)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid locker PIN.")
 
-    # 3. If both are valid, log the access
-    crud.create_access_log(db=db, user=current_user)
+    # 3. If both are valid, log the access (buffered; failed attempts above are logged the same way)
+    access_log_writer.record(current_user.id, SUCCESS)
 
     return {"message": "Locker unlocked successfully."}
\ No newline at end of file
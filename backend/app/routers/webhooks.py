@@ -1,80 +1,44 @@
-from fastapi import APIRouter, Request, Header, HTTPException, status, Depends
-import razorpay
+import json
 from typing import Optional
-from sqlalchemy.orm import Session
 
-from app.core.config import settings
-from app.database.session import SessionLocal
-# --- ADD THESE IMPORTS ---
-from app import crud, models
-from app.services import sms_service
-# --- END ADDITION ---
+from fastapi import APIRouter, Request, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
 
-router = APIRouter()
+from app.jobs.handlers import PAYMENT_CAPTURED
+from app.jobs.queue import job_queue
+from app.services import payment_service
 
-# Dependency to get a DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter()
 
 @router.post("/webhooks/razorpay")
 async def razorpay_webhook(
     request: Request,
     x_razorpay_signature: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    x_razorpay_event_id: Optional[str] = Header(None),
 ):
     """
     Handles incoming webhooks from Razorpay to confirm payment success.
+    The work itself (activation, SMS, face embedding) is queued for the job workers,
+    so Razorpay gets its 200 right away instead of timing out and redelivering.
     """
     if x_razorpay_signature is None:
         raise HTTPException(status_code=400, detail="X-Razorpay-Signature header not found")
 
     body = await request.body()
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-
-    try:
-        client.utility.verify_webhook_signature(
-            body.decode('utf-8'),
-            x_razorpay_signature,
-            settings.RAZORPAY_WEBHOOK_SECRET
-        )
-    except razorpay.errors.SignatureVerificationError:
+    if not payment_service.verify_webhook_signature(body.decode('utf-8'), x_razorpay_signature):
         raise HTTPException(status_code=400, detail="Razorpay signature verification failed")
 
-    payload = await request.json()
+    payload = json.loads(body)
     event = payload.get("event")
 
     if event == "payment.captured":
-        # --- COMPLETE BUSINESS LOGIC ---
-        
-        # 1. Extract user email from the payload.
-        user_email = payload['payload']['payment']['entity']['email']
-        
-        # 2. Find the user in your database.
-        db_user = crud.crud_user.get_user_by_email(db, email=user_email)
-        if not db_user:
-            print(f"Webhook received for non-existent user: {user_email}")
-            return {"status": "error", "detail": "User not found"}
-        
-        # 3. Update their status to 'ACTIVE'. 🔄
-        crud.crud_user.update_user_status(db, user=db_user, new_status=models.user.UserStatus.ACTIVE)
-        
-        # 4. Generate, save, and get their temporary password. 🔑
-        temp_password = crud.crud_user.set_temporary_password(db, user=db_user)
-        
-        # 5. Send the password via SMS.
-        sms_service.send_sms(
-            phone_number=db_user.phone_number,
-            message=f"Payment successful! Your LockSafe temporary password is: {temp_password}"
-        )
-        
-        # 6. Generate and store the face embedding, then delete the original image. 👤
-        crud.crud_user.finalize_face_embedding(db, user=db_user)
-
-        print(f"User {user_email} successfully activated.")
-        # --- END OF BUSINESS LOGIC ---
-        
-    return {"status": "ok"}
\ No newline at end of file
+        payment = payload['payload']['payment']['entity']
+        # Keyed by payment id: redeliveries of the event (and duplicate events) are one job
+        payment_id = payment.get('id') or x_razorpay_event_id
+        if not payment_id:
+            raise HTTPException(status_code=400, detail="Webhook has neither a payment id nor an event id")
+        key = f"{event}:{payment_id}"
+        created = await run_in_threadpool(job_queue.enqueue, PAYMENT_CAPTURED, key, {"email": payment['email']})
+        print(f"Webhook {key} {'queued' if created else 'already queued; ignored'}")
+
+    return {"status": "ok"}
@@ -131,11 +131,32 @@ class UserSimple(BaseModel):
 class AccessLogResponse(BaseModel):
     id: int
     access_time: datetime
+    status: str # SUCCESS, INVALID_OTP or INVALID_PIN
     user: UserSimple # Nest the user details
 
     class Config:
         from_attributes = True
 
+# One page of access logs, newest first; pass next_cursor back to get the next page
+class AccessLogPage(BaseModel):
+    items: List[AccessLogResponse]
+    next_cursor: Optional[str] = None # None on the last page
+
+# Request body for approving several applications at once
+class BulkApproveRequest(BaseModel):
+    user_ids: List[int]
+
+# Outcome of one application in a bulk approval
+class ApprovalResult(BaseModel):
+    user_id: int
+    approved: bool
+    payment_link: Optional[str] = None
+    sms_sent: bool = False
+    detail: Optional[str] = None
+
+class BulkApproveResponse(BaseModel):
+    results: List[ApprovalResult]
+
 # Schema for the dashboard statistics response
 class DashboardStats(BaseModel):
     pending_count: int
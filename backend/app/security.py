@@ -4,7 +4,6 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -15,12 +14,10 @@ from app.database.session import SessionLocal
 from app.crud import crud_user
 from app.models import user as user_models
 from app.schemas import user as user_schemas
+from app.services.principal_cache import Principal, principal_cache
 # --- END CHANGE ---
 
 
-# Hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 
@@ -31,12 +28,6 @@ def get_db():
     finally:
         db.close()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -47,7 +38,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> user_models.User:
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    The active user the token belongs to, as a slim Principal. Served from the
+    principal cache when possible, so most requests don't touch the database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -65,16 +60,38 @@ def get_current_active_user(token: str = Depends(oauth2_scheme), db: Session = D
     except JWTError:
         raise credentials_exception
     
-    user = crud_user.get_user_by_email(db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-    
-    if user.status != user_models.UserStatus.ACTIVE:
+    principal = principal_cache.get(token_data.email)
+    if principal is None:
+        principal = crud_user.get_principal_by_email(db, email=token_data.email)
+        if principal is None:
+            raise credentials_exception
+        # Only active users are cached, so an activation is picked up on the next request
+        if principal.status == user_models.UserStatus.ACTIVE:
+            principal_cache.put(token_data.email, principal)
+
+    if principal.status != user_models.UserStatus.ACTIVE:
         raise HTTPException(status_code=400, detail="Inactive user")
-        
+
+    return principal
+
+def get_current_active_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> user_models.User:
+    """
+    The full User row of the authenticated user, for endpoints that work with its
+    relationships (e.g. the locker). Loaded by primary key.
+    """
+    user = crud_user.get_user_by_id(db, user_id=principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
-def get_current_admin_user(current_user: user_models.User = Depends(get_current_active_user)) -> user_models.User:
+def get_current_admin_user(current_user: Principal = Depends(get_current_principal)) -> Principal:
     if current_user.email != settings.ADMIN_EMAIL:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
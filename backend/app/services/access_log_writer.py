@@ -0,0 +1,165 @@
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.models.user import AccessLog
+
+# Access log statuses
+SUCCESS = "SUCCESS"
+INVALID_OTP = "INVALID_OTP"
+INVALID_PIN = "INVALID_PIN"
+
+
+class AccessLogWriter:
+    """
+    Write-behind buffer for access logs, so an unlock attempt never waits on a commit.
+
+    record() only appends to an in-memory buffer (the time is taken then, not when
+    the row is written). A background thread writes the buffer in one multi-row
+    INSERT as soon as `batch_size` entries are waiting or the oldest one has waited
+    `flush_interval_ms`, and close() writes whatever is left on shutdown.
+
+    If a write fails the entries go back to the front of the buffer and are retried
+    on the next flush; beyond `max_buffered` entries the oldest are dropped (and
+    counted) rather than letting memory grow while the database is unreachable.
+    """
+    def __init__(self, batch_size: int, flush_interval_ms: float, max_buffered: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffered = max_buffered
+        self._buffer = []  # rows for the INSERT, oldest first
+        self._oldest_at = None  # monotonic time the oldest buffered entry was recorded
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one write at a time, so rows go in in order
+        self._thread = None
+        self._closed = False
+        self._written = 0
+        self._dropped = 0
+        self._overflowing = False  # dropping entries since the last successful write
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._total_flush_seconds = 0.0
+        self._last_flush_ms = None
+        self._max_flush_ms = 0.0
+
+    def start(self):
+        with self._condition:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stops the background thread and writes everything still buffered."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def record(self, user_id: int, status: str):
+        """Buffers one access attempt; never blocks on the database."""
+        self.start()
+        with self._condition:
+            first = not self._buffer
+            if first:
+                self._oldest_at = time.monotonic()
+            self._buffer.append({"user_id": user_id, "status": status, "access_time": datetime.utcnow()})
+            self._drop_overflow()
+            # Wake the writer to start the interval timer, or to write a full batch
+            if first or len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> bool:
+        """Writes everything buffered so far in one transaction; False if that failed."""
+        with self._flush_lock:
+            with self._condition:
+                rows, self._buffer, self._oldest_at = self._buffer, [], None
+            if not rows:
+                return True
+
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                db.execute(insert(AccessLog), rows)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error writing {len(rows)} access logs, will retry: {e}")
+                with self._condition:
+                    self._failed_flushes += 1
+                    self._buffer[:0] = rows
+                    self._oldest_at = time.monotonic()
+                    self._drop_overflow()
+                return False
+            finally:
+                db.close()
+
+            elapsed = time.perf_counter() - start
+            with self._condition:
+                self._overflowing = False
+                self._written += len(rows)
+                self._flushes += 1
+                self._total_flush_seconds += elapsed
+                self._last_flush_ms = round(elapsed * 1000, 1)
+                self._max_flush_ms = max(self._max_flush_ms, self._last_flush_ms)
+            return True
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {
+                "buffered": len(self._buffer),
+                "batch_size": self.batch_size,
+                "flush_interval_ms": self.flush_interval * 1000,
+                "written": self._written,
+                "dropped": self._dropped,
+                "flushes": self._flushes,
+                "failed_flushes": self._failed_flushes,
+                "avg_flush_ms": round(self._total_flush_seconds / self._flushes * 1000, 1) if self._flushes else None,
+                "last_flush_ms": self._last_flush_ms,
+                "max_flush_ms": self._max_flush_ms,
+            }
+
+    def _drop_overflow(self):
+        # Called with the condition held
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self._dropped += overflow
+            if not self._overflowing:
+                self._overflowing = True
+                print(f"Access log buffer full ({self.max_buffered} entries); dropping the oldest until a write succeeds")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._buffer:
+                        if len(self._buffer) >= self.batch_size:
+                            break
+                        timeout = self._oldest_at + self.flush_interval - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return  # close() does the final flush
+            if not self.flush():
+                # Don't retry a failing database in a tight loop
+                with self._condition:
+                    if not self._closed:
+                        self._condition.wait(self.flush_interval)
+
+
+# A single, process-wide writer
+access_log_writer = AccessLogWriter(
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval_ms=settings.ACCESS_LOG_FLUSH_INTERVAL_MS,
+    max_buffered=settings.ACCESS_LOG_MAX_BUFFERED,
+)
@@ -0,0 +1,23 @@
+import numpy as np
+
+# Face embeddings are stored as raw little-endian float32 bytes
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+
+def embedding_to_bytes(embedding) -> bytes:
+    """Packs an embedding (list or array of floats) into the binary column format."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def embedding_from_bytes(data: bytes) -> np.ndarray:
+    """
+    Returns a read-only float32 view over stored embedding bytes, without copying.
+    """
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def embeddings_from_bytes(blobs: list[bytes]) -> np.ndarray:
+    """Stacks many stored embeddings into an (N, dim) float32 matrix with a single copy."""
+    if not blobs:
+        return np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+    return np.frombuffer(b"".join(blobs), dtype=EMBEDDING_DTYPE).reshape(len(blobs), -1)
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.vision.worker_pool import vision_pool
+
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests from concurrent verify sessions and runs them as
+    one batched forward pass.
+
+    A batch is closed once it holds `max_batch_size` images or its first request
+    has waited `max_wait_ms`. Each caller gets its own result back through a future.
+    Up to `max_concurrent_batches` batches run at once (one per vision worker);
+    while they are all busy new requests keep accumulating into the next batch.
+    """
+    def __init__(self, run_batch, max_batch_size: int, max_wait_ms: float, max_concurrent_batches: int = 1):
+        self._run_batch = run_batch  # async callable: list of images -> list of embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue = None
+        self._task = None
+        self._batches = 0
+        self._images = 0
+        self._largest_batch = 0
+        self._total_batch_seconds = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._collect_batches())
+
+    async def stop(self):
+        """Stops batching; requests still waiting for a batch fail with RuntimeError."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                self._fail(future)
+
+    @staticmethod
+    def _fail(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(RuntimeError("Embedding engine stopped"))
+
+    async def embed(self, image: np.ndarray) -> list[float] | None:
+        """Queues one image (a face crop or a frame) and waits for its embedding."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    def metrics(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "images": self._images,
+            "avg_batch_size": round(self._images / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "avg_batch_ms": round(self._total_batch_seconds / self._batches * 1000, 1) if self._batches else 0.0,
+        }
+
+    async def _collect_batches(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        while True:
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Stopped while this batch was still filling up
+                for _, future in batch:
+                    self._fail(future)
+                raise
+            task = asyncio.create_task(self._process(batch))
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _process(self, batch: list):
+        # Requests whose sessions went away in the meantime are dropped from the batch
+        batch = [(image, future) for image, future in batch if not future.done()]
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        try:
+            results = await self._run_batch([image for image, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Embedding batch returned {len(results)} results for {len(batch)} images")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._images += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        self._total_batch_seconds += time.perf_counter() - start
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# A single, process-wide engine shared by all verify sessions
+embedding_engine = EmbeddingBatcher(
+    run_batch=vision_pool.embed_images,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    max_concurrent_batches=max(settings.VISION_WORKERS, 1),
+)
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.face_index import IVFIndex, create_index, load_index
+
+# How many embeddings to fetch per query when syncing the gallery with the database
+SYNC_FETCH_CHUNK = 500
+
+
+@dataclass
+class GalleryMatch:
+    """A single gallery hit. `margin` is how much closer the best match is than the runner-up."""
+    user_id: int
+    distance: float
+    margin: float
+
+
+class FaceGallery:
+    """
+    Keeps the face embeddings of all active users in memory in a search index
+    (exact or IVF, chosen by FACE_INDEX_TYPE) so a lookup is a few matrix-vector
+    products instead of a Python loop over ORM rows.
+    The index can be persisted to FACE_INDEX_PATH so a restart only has to
+    reconcile user ids and embedding versions with the database instead of
+    reloading every embedding.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+        self._loaded_at = None
+        self._versions = {}  # user id -> face_embedding_version of the indexed vector
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._index) if self._index is not None else 0
+
+    def _new_index(self, dim: int):
+        return create_index(
+            settings.FACE_INDEX_TYPE, dim,
+            nlist=settings.FACE_IVF_NLIST, nprobe=settings.FACE_IVF_NPROBE
+        )
+
+    def load(self, db: Session):
+        """
+        Rebuilds the index from every active user that has a stored face embedding.
+        """
+        # Imported here: crud_user imports face_service, which imports this module
+        from app.crud import crud_user
+
+        # Read before the embeddings: a row re-embedded in between then looks
+        # changed on the next sync and is fetched again, rather than missed
+        versions = crud_user.get_active_face_embedding_versions(db)
+        chunks = list(crud_user.iter_active_face_embeddings(db))
+        with self._lock:
+            if chunks:
+                ids = np.concatenate([chunk[0] for chunk in chunks])
+                vectors = np.concatenate([chunk[1] for chunk in chunks])
+                index = self._new_index(vectors.shape[1])
+                index.build(ids, vectors)
+            else:
+                ids, index = [], None
+            self._index = index
+            self._versions = {int(user_id): versions.get(int(user_id)) for user_id in ids}
+            self._loaded_at = time.monotonic()
+            self._dirty = True
+            self._save()
+        print(f"Face gallery loaded with {len(ids)} embeddings ({settings.FACE_INDEX_TYPE} index)")
+
+    def sync(self, db: Session):
+        """
+        Brings the index in line with the database: adds active users that are
+        missing or whose embedding changed (by face_embedding_version) and drops
+        users that are no longer active. Only ids and versions are fetched for
+        users whose indexed embedding is current.
+        """
+        from app.crud import crud_user
+
+        with self._lock:
+            if self._index is None and settings.FACE_INDEX_PATH and os.path.exists(settings.FACE_INDEX_PATH):
+                self._index = load_index(
+                    settings.FACE_INDEX_PATH,
+                    nlist=settings.FACE_IVF_NLIST, nprobe=settings.FACE_IVF_NPROBE
+                )
+                if self._index.kind != settings.FACE_INDEX_TYPE:
+                    # FACE_INDEX_TYPE changed since the file was written; rebuild below
+                    self._index = None
+                else:
+                    self._versions = self._load_versions(settings.FACE_INDEX_PATH)
+                    print(f"Face gallery restored {len(self._index)} embeddings from {settings.FACE_INDEX_PATH}")
+            if self._index is None or self._needs_retraining():
+                self.load(db)
+                return
+
+            active = crud_user.get_active_face_embedding_versions(db)
+            indexed_ids = set(self._index.ids().tolist())
+            stale = sorted(user_id for user_id, version in active.items() if self._versions.get(user_id) != version)
+            removed = indexed_ids - active.keys()
+            for user_id in removed:
+                self._index.remove(user_id)
+                self._versions.pop(user_id, None)
+
+            for start in range(0, len(stale), SYNC_FETCH_CHUNK):
+                chunk = stale[start:start + SYNC_FETCH_CHUNK]
+                for ids, vectors in crud_user.iter_active_face_embeddings(db, user_ids=chunk):
+                    self._index.add(ids, vectors)  # replaces the old vector of a changed user
+                    self._versions.update((int(user_id), active[int(user_id)]) for user_id in ids)
+
+            self._dirty = self._dirty or bool(stale) or bool(removed)
+            self._loaded_at = time.monotonic()
+            self._save()
+
+    def ensure_loaded(self, db: Session):
+        """
+        Loads the gallery on first use and re-syncs it once it is older than
+        FACE_GALLERY_REFRESH_SECONDS, so changes made by other workers are picked up.
+        """
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.FACE_GALLERY_REFRESH_SECONDS:
+            self.sync(db)
+
+    def resync_after_miss(self, db: Session) -> bool:
+        """
+        Re-syncs after a failed match unless the last sync is under
+        FACE_GALLERY_MISS_RESYNC_SECONDS old. Users activated or re-embedded by the
+        job workers are otherwise only seen after FACE_GALLERY_REFRESH_SECONDS.
+        Returns whether it synced.
+        """
+        with self._lock:
+            # Checked under the lock, so concurrent misses cause one sync, not one each
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.FACE_GALLERY_MISS_RESYNC_SECONDS:
+                return False
+            self.sync(db)
+            return True
+
+    def upsert(self, user_id: int, embedding: list[float], version: int | None = None):
+        """
+        Adds a user's embedding to the gallery, replacing any previous one.
+        `version` is the row's face_embedding_version; without it the next sync
+        fetches the embedding again.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            if self._index is None:
+                self._index = self._new_index(vector.shape[0])
+            self._index.add([user_id], vector[np.newaxis, :])
+            self._versions[user_id] = version
+            self._dirty = True
+
+    def remove(self, user_id: int):
+        """
+        Drops a user from the gallery (e.g. when they are no longer ACTIVE).
+        """
+        with self._lock:
+            if self._index is not None and user_id in self._index:
+                self._index.remove(user_id)
+                self._versions.pop(user_id, None)
+                self._dirty = True
+
+    def search(self, embedding: list[float], k: int = 2) -> list[GalleryMatch]:
+        """
+        Returns up to `k` closest users by cosine distance, best first.
+        """
+        with self._lock:
+            if self._index is None:
+                return []
+            ids, distances = self._index.search(embedding, k=k)
+
+        matches = []
+        for rank in range(len(ids)):
+            next_distance = distances[rank + 1] if rank + 1 < len(ids) else np.inf
+            matches.append(GalleryMatch(
+                user_id=int(ids[rank]),
+                distance=float(distances[rank]),
+                margin=float(next_distance - distances[rank])
+            ))
+        return matches
+
+    def best_match(self, embedding: list[float]) -> GalleryMatch | None:
+        """
+        Returns the closest user together with its distance and the runner-up margin.
+        """
+        matches = self.search(embedding, k=2)
+        return matches[0] if matches else None
+
+    def _needs_retraining(self) -> bool:
+        """An IVF quantizer trained on a much smaller gallery gives unbalanced lists."""
+        index = self._index
+        return (
+            isinstance(index, IVFIndex)
+            and len(index) > settings.FACE_IVF_RETRAIN_GROWTH * max(index.trained_on, 1)
+        )
+
+    @staticmethod
+    def _load_versions(path: str) -> dict[int, int]:
+        """Embedding versions saved with the index; none for a file written before they were."""
+        with np.load(path) as data:
+            if "version_ids" not in data.files:
+                return {}
+            return dict(zip(data["version_ids"].tolist(), data["versions"].tolist()))
+
+    def _save(self):
+        if settings.FACE_INDEX_PATH and self._dirty and self._index is not None:
+            # Unknown versions (upserts without one) are left out, so they are re-fetched after a restart
+            known = {user_id: version for user_id, version in self._versions.items() if version is not None}
+            self._index.save(
+                settings.FACE_INDEX_PATH,
+                version_ids=np.fromiter(known.keys(), dtype=np.int64, count=len(known)),
+                versions=np.fromiter(known.values(), dtype=np.int64, count=len(known)),
+            )
+            self._dirty = False
+
+
+# A single, process-wide gallery shared by all requests
+gallery = FaceGallery()
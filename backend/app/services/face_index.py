@@ -0,0 +1,324 @@
+import os
+
+import numpy as np
+
+# Number of vectors scored per matrix product when assigning vectors to centroids.
+# Keeps the temporary (chunk x nlist) score matrix small for million-scale galleries.
+ASSIGN_CHUNK = 65536
+
+# FAISS rule of thumb: k-means needs roughly 39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalizes a vector or each row of a matrix, as float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, highest first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+def _atomic_savez(path: str, **arrays):
+    """Writes an .npz file so that readers never see a half-written index."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+class _VectorList:
+    """
+    A growable (ids, vectors) store with amortized O(1) append and O(1) swap-remove.
+    """
+    def __init__(self, dim: int, capacity: int = 16):
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.size = 0
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> int:
+        """Appends rows and returns the position of the first one."""
+        start, end = self.size, self.size + len(ids)
+        if end > len(self.ids):
+            capacity = max(end, 2 * len(self.ids))
+            self.ids = np.resize(self.ids, capacity)
+            grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[:start] = self.vectors[:start]
+            self.vectors = grown
+        self.ids[start:end] = ids
+        self.vectors[start:end] = vectors
+        self.size = end
+        return start
+
+    def remove_at(self, pos: int) -> int | None:
+        """Removes the row at `pos` by moving the last row into it. Returns the moved id, if any."""
+        last = self.size - 1
+        moved = None
+        if pos != last:
+            self.ids[pos] = self.ids[last]
+            self.vectors[pos] = self.vectors[last]
+            moved = int(self.ids[pos])
+        self.size = last
+        return moved
+
+    def view(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.ids[:self.size], self.vectors[:self.size]
+
+
+class ExactIndex:
+    """
+    Brute-force cosine index: scores the query against every stored vector.
+    Exact, and the fastest choice up to a few hundred thousand users.
+    """
+    kind = "exact"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._store = _VectorList(dim)
+        self._pos = {}  # user id -> row in the store
+
+    def __len__(self):
+        return self._store.size
+
+    def __contains__(self, user_id: int):
+        return user_id in self._pos
+
+    def ids(self) -> np.ndarray:
+        return self._store.view()[0].copy()
+
+    def build(self, ids, vectors):
+        """Replaces the contents of the index."""
+        self._store = _VectorList(self.dim, capacity=max(16, len(ids)))
+        self._pos = {}
+        self.add(ids, vectors)
+
+    def add(self, ids, vectors):
+        """Inserts (or replaces) vectors for the given user ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize(vectors).reshape(len(ids), self.dim)
+        for user_id in ids:
+            self.remove(int(user_id))
+        start = self._store.append(ids, vectors)
+        for offset, user_id in enumerate(ids):
+            self._pos[int(user_id)] = start + offset
+
+    def remove(self, user_id: int):
+        pos = self._pos.pop(user_id, None)
+        if pos is None:
+            return
+        moved = self._store.remove_at(pos)
+        if moved is not None:
+            self._pos[moved] = pos
+
+    def search(self, query, k: int = 2) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the ids and cosine distances of the `k` nearest vectors, nearest first."""
+        ids, vectors = self._store.view()
+        scores = vectors @ normalize(query)
+        top = _top_k(scores, k)
+        return ids[top], 1.0 - scores[top]
+
+    def save(self, path: str, **extra):
+        """`extra` arrays are stored alongside the index and ignored by load_index()."""
+        ids, vectors = self._store.view()
+        _atomic_savez(path, kind=np.array(self.kind), ids=ids, vectors=vectors, **extra)
+
+    @classmethod
+    def _from_arrays(cls, data):
+        index = cls(dim=data["vectors"].shape[1])
+        index.build(data["ids"], data["vectors"])
+        return index
+
+
+class IVFIndex:
+    """
+    Inverted-file index with a spherical k-means coarse quantizer.
+    Vectors are bucketed by their nearest centroid and a query only scans the
+    `nprobe` buckets whose centroids are closest to it, trading a little recall
+    for a search cost of roughly nprobe/nlist of an exact scan.
+    """
+    kind = "ivf"
+
+    def __init__(self, dim: int, nlist: int = 1024, nprobe: int = 16, train_iterations: int = 10,
+                 max_training_points: int = 100000, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.max_training_points = max_training_points
+        self.seed = seed
+        self.centroids = None
+        self.trained_on = 0  # Gallery size when the quantizer was last trained
+        self._lists = []
+        self._where = {}  # user id -> (list number, row in that list)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, user_id: int):
+        return user_id in self._where
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def ids(self) -> np.ndarray:
+        return np.fromiter(self._where.keys(), dtype=np.int64, count=len(self._where))
+
+    def train(self, vectors):
+        """
+        Fits the coarse quantizer on (a sample of) the given vectors.
+        The number of lists is capped so each centroid has enough training points.
+        """
+        vectors = normalize(vectors)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.max_training_points:
+            vectors = vectors[rng.choice(len(vectors), self.max_training_points, replace=False)]
+
+        nlist = max(1, min(self.nlist, len(vectors) // MIN_POINTS_PER_CENTROID))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assign = self._assign(vectors, centroids)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # Sum the members of each cluster with one sort + reduceat instead of a Python loop
+            order = np.argsort(assign, kind="stable")
+            starts = (np.cumsum(counts) - counts)[~empty]
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(vectors[order], starts, axis=0)
+            # Re-seed empty clusters with random points so every list stays useful
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        self.centroids = centroids
+        self.trained_on = len(vectors)
+
+    def build(self, ids, vectors):
+        """Retrains the quantizer and replaces the contents of the index."""
+        vectors = normalize(vectors).reshape(len(ids), self.dim)
+        self._lists, self._where = [], {}
+        self.centroids = None
+        if len(ids):
+            self.train(vectors)
+            self.trained_on = len(ids)
+            self.add(ids, vectors)
+
+    def add(self, ids, vectors):
+        """Inserts (or replaces) vectors, routing each one to its nearest centroid."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize(vectors).reshape(len(ids), self.dim)
+        if not self.is_trained:
+            self.train(vectors)
+        if not self._lists:
+            self._lists = [_VectorList(self.dim) for _ in range(len(self.centroids))]
+
+        for user_id in ids:
+            self.remove(int(user_id))
+        assign = self._assign(vectors, self.centroids)
+        for list_no in np.unique(assign):
+            rows = np.flatnonzero(assign == list_no)
+            start = self._lists[list_no].append(ids[rows], vectors[rows])
+            for offset, user_id in enumerate(ids[rows]):
+                self._where[int(user_id)] = (int(list_no), start + offset)
+
+    def remove(self, user_id: int):
+        where = self._where.pop(user_id, None)
+        if where is None:
+            return
+        list_no, pos = where
+        moved = self._lists[list_no].remove_at(pos)
+        if moved is not None:
+            self._where[moved] = (list_no, pos)
+
+    def search(self, query, k: int = 2, nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the ids and cosine distances of the approximate `k` nearest vectors, nearest first."""
+        if not self._where:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = normalize(query)
+        probes = _top_k(self.centroids @ query, nprobe or self.nprobe)
+        ids, scores = [], []
+        for list_no in probes:
+            list_ids, list_vectors = self._lists[list_no].view()
+            if len(list_ids):
+                ids.append(list_ids)
+                scores.append(list_vectors @ query)
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        top = _top_k(scores, k)
+        return ids[top], 1.0 - scores[top]
+
+    def save(self, path: str, **extra):
+        """`extra` arrays are stored alongside the index and ignored by load_index()."""
+        views = [lst.view() for lst in self._lists]
+        ids = np.concatenate([v[0] for v in views]) if views else np.empty(0, dtype=np.int64)
+        vectors = np.concatenate([v[1] for v in views]) if views else np.empty((0, self.dim), dtype=np.float32)
+        lengths = np.array([len(v[0]) for v in views], dtype=np.int64)
+        centroids = self.centroids if self.is_trained else np.empty((0, self.dim), dtype=np.float32)
+        _atomic_savez(
+            path, kind=np.array(self.kind), ids=ids, vectors=vectors, lengths=lengths,
+            centroids=centroids, trained_on=np.array(self.trained_on), **extra
+        )
+
+    @classmethod
+    def _from_arrays(cls, data, **params):
+        dim = data["vectors"].shape[1]
+        index = cls(dim=dim, **params)
+        if len(data["centroids"]):
+            index.centroids = data["centroids"]
+            index.trained_on = int(data["trained_on"])
+            index._lists = [_VectorList(dim) for _ in range(len(index.centroids))]
+            ids, vectors = data["ids"], data["vectors"]
+            start = 0
+            # Restore the stored list layout instead of re-assigning every vector
+            for list_no, length in enumerate(data["lengths"]):
+                end = start + int(length)
+                index._lists[list_no].append(ids[start:end], vectors[start:end])
+                for pos, user_id in enumerate(ids[start:end]):
+                    index._where[int(user_id)] = (list_no, pos)
+                start = end
+        return index
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Returns the nearest centroid of each vector."""
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), ASSIGN_CHUNK):
+            chunk = vectors[start:start + ASSIGN_CHUNK]
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return assign
+
+
+INDEX_TYPES = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def create_index(kind: str, dim: int, **params):
+    """Creates an empty index of the given kind ('exact' or 'ivf')."""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown face index type '{kind}'. Expected one of {list(INDEX_TYPES)}")
+    if kind == ExactIndex.kind:
+        return ExactIndex(dim)
+    return IVFIndex(dim, **params)
+
+
+def load_index(path: str, **params):
+    """Loads an index written by `save()`. `params` apply to IVF indexes only."""
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown face index type '{kind}' in {path}")
+        arrays = {key: data[key] for key in data.files}
+    if kind == ExactIndex.kind:
+        return ExactIndex._from_arrays(arrays)
+    return IVFIndex._from_arrays(arrays, **params)
@@ -1,4 +1,7 @@
 import base64
+import threading
+import time
+
 import numpy as np
 import cv2
 from deepface import DeepFace
@@ -6,6 +9,53 @@ from sqlalchemy.orm import Session
 
 # Correctly import the 'user' module from the 'models' package
 from app import models
+from app.core.config import settings
+from app.services.face_gallery import gallery
+
+EMBEDDING_MODEL_NAME = 'VGG-Face'
+
+# Size of the synthetic image used to warm up the embedding model
+WARMUP_IMAGE_SIZE = 224
+
+# Stale gallery entries (users deleted or no longer active) skipped per match before giving up
+MAX_STALE_MATCHES = 5
+
+_model_lock = threading.Lock()
+_model_ready = False
+
+
+def load_embedding_model() -> dict:
+    """
+    Builds the embedding model once per process and runs a warm-up inference on a
+    synthetic image, so the first real request does not pay for loading weights.
+    Returns the load and first-inference timings in milliseconds.
+    """
+    global _model_ready
+    with _model_lock:
+        if _model_ready:
+            return {}
+
+        start = time.perf_counter()
+        DeepFace.build_model(model_name=EMBEDDING_MODEL_NAME)
+        load_ms = (time.perf_counter() - start) * 1000
+        print(f"{EMBEDDING_MODEL_NAME} model loaded in {load_ms:.0f} ms")
+
+        start = time.perf_counter()
+        DeepFace.represent(
+            img_path=np.zeros((WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE, 3), dtype=np.uint8),
+            model_name=EMBEDDING_MODEL_NAME,
+            enforce_detection=False # There is no face in the warm-up image
+        )
+        first_inference_ms = (time.perf_counter() - start) * 1000
+        print(f"{EMBEDDING_MODEL_NAME} warm-up inference took {first_inference_ms:.0f} ms")
+
+        _model_ready = True
+        return {"load_ms": round(load_ms, 1), "first_inference_ms": round(first_inference_ms, 1)}
+
+
+def is_model_ready() -> bool:
+    return _model_ready
+
 
 def _decode_image(image_base64: str) -> np.ndarray | None:
     """Helper function to decode a base64 string into a CV2 image."""
@@ -34,7 +84,7 @@ def generate_embedding(image_blob: bytes) -> list[float] | None:
         # Use DeepFace to represent the face as a vector
         embedding_obj = DeepFace.represent(
             img_path=img,
-            model_name='VGG-Face',
+            model_name=EMBEDDING_MODEL_NAME,
             enforce_detection=True # Fails if no face is found
         )
         return embedding_obj[0]['embedding']
@@ -46,33 +96,105 @@ def generate_embedding(image_blob: bytes) -> list[float] | None:
         return None
 
 
-def find_matching_user(db: Session, target_embedding: list[float], threshold: float = 0.40) -> models.user.User | None:
+def crop_aligned_face(img: np.ndarray, face_box, eyes=None) -> np.ndarray:
     """
-    Finds a user in the database whose stored face embedding matches a target embedding.
-    Uses Cosine Distance. A lower distance means a better match.
+    Cuts a face out of a frame the way DeepFace's detector + alignment step would:
+    a square as wide as `face_box` (x_min, y_min, x_max, y_max) around its centre,
+    rotated about that centre so the two `eyes` ((x, y) points) are level.
+    Pixels outside the frame come out black, as they do in DeepFace.
     """
+    x_min, y_min, x_max, y_max = face_box
+    side = max(int(x_max - x_min), 1)
+    center = ((x_min + x_max) / 2, (y_min + y_max) / 2)
+    angle = 0.0
+    if eyes is not None:
+        (left_x, left_y), (right_x, right_y) = sorted(map(tuple, eyes))  # left as seen in the image
+        angle = float(np.degrees(np.arctan2(right_y - left_y, right_x - left_x)))
 
-    # Fetch all active users who have a face embedding stored
-    # Corrected the references from models.User to models.user.User
-    users_with_embeddings = db.query(models.user.User).filter(
-        models.user.User.face_embedding.isnot(None),
-        models.user.User.status == models.user.UserStatus.ACTIVE
-    ).all()
+    # Rotation and crop in one warp: only the side x side output pixels are computed
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    matrix[0, 2] += side / 2 - center[0]
+    matrix[1, 2] += side / 2 - center[1]
+    return cv2.warpAffine(img, matrix, (side, side), flags=cv2.INTER_LINEAR, borderValue=(0, 0, 0))
 
-    target_np = np.array(target_embedding)
 
-    for user in users_with_embeddings:
-        stored_np = np.array(user.face_embedding)
-        
-        # Calculate Cosine Distance
-        dot_product = np.dot(stored_np, target_np)
-        norm = np.linalg.norm(stored_np) * np.linalg.norm(target_np)
-        similarity = dot_product / norm
-        distance = 1 - similarity
-
-        if distance <= threshold:
-            print(f"Match found for user ID {user.id} with distance {distance}")
+def generate_embeddings_from_arrays(images: list[np.ndarray], aligned: bool = False) -> list[list[float] | None]:
+    """
+    Generates embeddings for in-memory BGR images with a single batched forward pass.
+    With `aligned`, the images are face crops from crop_aligned_face and DeepFace's
+    face detector is skipped. Returns one entry per image, None where no face could be processed.
+    """
+    try:
+        results = DeepFace.represent(
+            img_path=images,
+            model_name=EMBEDDING_MODEL_NAME,
+            detector_backend='skip' if aligned else 'opencv',
+            enforce_detection=not aligned # Fails if no face is found
+        )
+    except ValueError as e:
+        if len(images) > 1:
+            # A single image without a face fails the whole batch; redo it one image at a time
+            return [generate_embeddings_from_arrays([img], aligned)[0] for img in images]
+        print(f"Face not detected or error in embedding generation: {e}")
+        return [None]
+    except Exception as e:
+        print(f"An unexpected error occurred during embedding generation: {e}")
+        return [None] * len(images)
+
+    if len(images) == 1:
+        results = [results] # DeepFace unwraps the result of a one-image batch
+    return [faces[0]['embedding'] if faces else None for faces in results]
+
+
+def generate_embedding_from_array(img: np.ndarray, face_box=None, eyes=None) -> list[float] | None:
+    """
+    Generates a facial vector embedding from an in-memory BGR frame. When the face was
+    already located (FaceMesh bbox, optionally the eye centres for alignment), the face
+    is cropped here and DeepFace's detector is skipped.
+    """
+    if face_box is not None:
+        img = crop_aligned_face(img, face_box, eyes)
+    return generate_embeddings_from_arrays([img], aligned=face_box is not None)[0]
+
+
+def generate_embeddings_batch(image_blobs: list[bytes]) -> list[list[float] | None]:
+    """
+    Generates embeddings for several encoded images with a single batched forward pass.
+    Returns one entry per image, None where no face could be processed.
+    """
+    images = [cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR) for blob in image_blobs]
+    readable = [i for i, img in enumerate(images) if img is not None]
+    embeddings = [None] * len(images)
+    if readable:
+        for i, embedding in zip(readable, generate_embeddings_from_arrays([images[i] for i in readable])):
+            embeddings[i] = embedding
+    return embeddings
+
+
+def find_matching_user(db: Session, target_embedding: list[float], threshold: float | None = None) -> models.user.User | None:
+    """
+    Finds the active user whose stored face embedding is closest to a target embedding.
+    Uses Cosine Distance against the in-memory face gallery. A lower distance means a better match.
+    """
+    if threshold is None:
+        threshold = settings.FACE_MATCH_THRESHOLD
+
+    gallery.ensure_loaded(db)
+    match = gallery.best_match(target_embedding)
+    if (match is None or match.distance > threshold) and gallery.resync_after_miss(db):
+        # The user may have been activated by a job worker since the last sync
+        match = gallery.best_match(target_embedding)
+
+    for _ in range(MAX_STALE_MATCHES + 1):
+        if match is None or match.distance > threshold:
+            break
+        user = db.get(models.user.User, match.user_id)
+        if user is not None and user.status == models.user.UserStatus.ACTIVE:
+            print(f"Match found for user ID {user.id} with distance {match.distance:.4f} (runner-up margin {match.margin:.4f})")
             return user
-            
+        # The gallery is stale for this user; drop them and try the next closest one
+        gallery.remove(match.user_id)
+        match = gallery.best_match(target_embedding)
+
     print("No matching user found.")
-    return None
\ No newline at end of file
+    return None
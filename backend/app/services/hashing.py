@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import settings
+
+# Hash purposes, each with its own bcrypt cost
+PASSWORD = "password"
+PIN = "pin"
+
+# Stored where no secret has been set yet (e.g. a new locker's PIN). It is not a
+# bcrypt hash, so it never verifies, and nothing has to be hashed to produce it.
+UNSET_HASH = "!"
+
+# bcrypt only uses the first 72 bytes of a secret; older bcrypt versions truncated
+# silently, newer ones raise, so secrets are truncated here to keep existing hashes valid
+BCRYPT_MAX_BYTES = 72
+
+
+def _hash_rounds(hashed: str) -> int | None:
+    """The cost factor of a bcrypt hash ("$2b$12$..."), or None if it isn't one."""
+    parts = hashed.split("$")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class CredentialHasher:
+    """
+    bcrypt hashing and verification for passwords and PINs, run in a dedicated thread
+    pool of `max_workers` threads (bcrypt releases the GIL), so at most that many
+    hashes burn CPU at once however many logins arrive together.
+
+    Each purpose has its own cost factor. verify_and_update() returns a fresh hash
+    when a stored hash was made with a different cost, so changing a cost setting
+    migrates users as they next log in.
+    """
+    def __init__(self, rounds: dict[str, int], max_workers: int):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="hasher")
+        self._lock = threading.Lock()
+        self._counts = {"hashes": 0, "verifications": 0, "rehashes": 0}
+        self._busy_seconds = 0.0
+        self._in_flight = 0
+
+    def _secret(self, secret: str) -> bytes:
+        return secret.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+    def _timed(self, kind: str, func, *args):
+        with self._lock:
+            self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._counts[kind] += 1
+                self._busy_seconds += time.perf_counter() - start
+
+    def _hash(self, purpose: str, secret: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds[purpose])
+        return self._timed("hashes", bcrypt.hashpw, self._secret(secret), salt).decode("ascii")
+
+    def _verify_and_update(self, purpose: str, secret: str, hashed: str | None) -> tuple[bool, str | None]:
+        rounds = _hash_rounds(hashed) if hashed else None
+        if rounds is None:
+            return False, None  # unset (sentinel) or not a bcrypt hash: nothing to check
+        try:
+            valid = self._timed("verifications", bcrypt.checkpw, self._secret(secret), hashed.encode("ascii"))
+        except ValueError:
+            return False, None  # malformed hash
+        if valid and rounds != self.rounds[purpose]:
+            with self._lock:
+                self._counts["rehashes"] += 1
+            return True, self._hash(purpose, secret)
+        return valid, None
+
+    # --- Async API, for handlers running on the event loop ---
+
+    async def hash(self, purpose: str, secret: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._hash, purpose, secret)
+
+    async def verify_and_update(self, purpose: str, secret: str, hashed: str | None) -> tuple[bool, str | None]:
+        """(is the secret valid, the new hash to store or None)."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._verify_and_update, purpose, secret, hashed
+        )
+
+    # --- Blocking API, for sync endpoints (threadpool), workers and scripts; never call it on the event loop ---
+
+    def hash_sync(self, purpose: str, secret: str) -> str:
+        return self._executor.submit(self._hash, purpose, secret).result()
+
+    def verify_and_update_sync(self, purpose: str, secret: str, hashed: str | None) -> tuple[bool, str | None]:
+        """(is the secret valid, the new hash to store or None)."""
+        return self._executor.submit(self._verify_and_update, purpose, secret, hashed).result()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            operations = self._counts["hashes"] + self._counts["verifications"]
+            return {
+                **self._counts,
+                "in_flight": self._in_flight,
+                "workers": self.max_workers,
+                "avg_ms": round(self._busy_seconds / operations * 1000, 1) if operations else None,
+                "rounds": dict(self.rounds),
+            }
+
+
+# A single, process-wide hasher
+credential_hasher = CredentialHasher(
+    rounds={PASSWORD: settings.PASSWORD_HASH_ROUNDS, PIN: settings.PIN_HASH_ROUNDS},
+    max_workers=settings.HASHING_WORKERS,
+)
@@ -0,0 +1,162 @@
+import hashlib
+import mmap
+import os
+import string
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from app.core.config import settings
+
+# Keys checked against the database per query while collecting garbage
+GC_BATCH_SIZE = 1000
+
+# Leading bytes of the image formats an upload may be in, and their media types
+MEDIA_TYPE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+
+class ImageStore:
+    """
+    Content-addressed image files on the local filesystem.
+
+    An image is stored once under the SHA-256 of its bytes (its key), two shard
+    directories deep ("ab/cd/abcd...") so no directory grows too large. Writes go
+    to a temporary file in the store that is fsynced and renamed into place, so a
+    reader never sees a partial image; stored files are never modified.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._tmp_dir = os.path.join(root, "tmp")
+
+    def path(self, key: str) -> str:
+        if len(key) != 64 or not set(key) <= set(string.hexdigits.lower()):
+            raise ValueError(f"Invalid image key: {key!r}")
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        """Stores an image (if it isn't already) and returns its key."""
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+        if os.path.exists(path):
+            # Refresh the time so garbage collection gives the new reference its grace period
+            os.utime(path)
+            return key
+
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return key
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def mapped(self, key: str):
+        """The image as a read-only memory map, for decoding without copying it first."""
+        with open(self.path(key), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # An empty file can't be mapped; it decodes to no image either way
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    def media_type(self, key: str) -> str:
+        """The image's media type, sniffed from its first bytes."""
+        with open(self.path(key), "rb") as f:
+            head = f.read(12)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image/webp"
+        for signature, media_type in MEDIA_TYPE_SIGNATURES:
+            if head.startswith(signature):
+                return media_type
+        return "application/octet-stream"
+
+    def delete(self, key: str, min_age_seconds: float = 0) -> bool:
+        """
+        Removes an image. With `min_age_seconds` one stored (or re-put) more recently
+        is kept: a registration that isn't committed yet may refer to it.
+        """
+        path = self.path(key)
+        try:
+            if min_age_seconds and os.stat(path).st_mtime > time.time() - min_age_seconds:
+                return False
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_files(self) -> Iterator[tuple[str, os.stat_result]]:
+        """(key, stat) of every stored image."""
+        for shard in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []:
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue  # e.g. tmp/
+            for subshard in sorted(os.listdir(shard_dir)):
+                with os.scandir(os.path.join(shard_dir, subshard)) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            yield entry.name, entry.stat()
+
+    def collect_garbage(self, referenced: Callable[[list[str]], set[str]], grace_seconds: float, dry_run: bool = False) -> dict:
+        """
+        Deletes stored images whose key `referenced` (which checks a batch of keys
+        against the database) doesn't return, and leftover temporary files. Anything
+        younger than `grace_seconds` is kept: it may belong to a registration whose
+        transaction hasn't committed yet.
+        """
+        cutoff = time.time() - grace_seconds
+        result = {"checked": 0, "deleted": 0, "bytes_freed": 0, "tmp_deleted": 0}
+
+        def sweep(batch: list[tuple[str, os.stat_result]]):
+            in_use = referenced([key for key, _ in batch])
+            for key, stat in batch:
+                # The age is checked again on delete: a registration may have re-put
+                # the photo since the walk, and its row may not be committed yet
+                if key not in in_use and (dry_run or self.delete(key, min_age_seconds=grace_seconds)):
+                    result["deleted"] += 1
+                    result["bytes_freed"] += stat.st_size
+
+        batch = []
+        for key, stat in self.iter_files():
+            result["checked"] += 1
+            if stat.st_mtime < cutoff:
+                batch.append((key, stat))
+            if len(batch) >= GC_BATCH_SIZE:
+                sweep(batch)
+                batch = []
+        if batch:
+            sweep(batch)
+
+        if os.path.isdir(self._tmp_dir):
+            with os.scandir(self._tmp_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        if not dry_run:
+                            os.remove(entry.path)
+                        result["tmp_deleted"] += 1
+        return result
+
+
+# A single, process-wide store
+image_store = ImageStore(settings.IMAGE_STORE_PATH)
@@ -0,0 +1,263 @@
+import asyncio
+import random
+import secrets
+import threading
+
+import aiohttp
+
+from app.core.config import settings
+
+TWILIO_API_URL = "https://api.twilio.com/2010-04-01"
+TWILIO_VERIFY_URL = "https://verify.twilio.com/v2"
+
+# Responses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class NotificationError(Exception):
+    """A backend call failed. `retryable` tells whether trying again may succeed."""
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# ===================================================================
+# Backends
+# ===================================================================
+
+class TwilioBackend:
+    """
+    Twilio Messaging and Verify over their REST API, on one pooled keep-alive
+    HTTP session per event loop.
+    """
+    name = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, verify_sid: str,
+                 timeout_seconds: float, pool_size: int):
+        self.account_sid = account_sid
+        self.from_number = from_number
+        self.verify_sid = verify_sid
+        self._auth = aiohttp.BasicAuth(account_sid, auth_token)
+        self._timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self._pool_size = pool_size
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily: an aiohttp session belongs to the loop it was created on
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, auth=self._auth, timeout=self._timeout)
+        return self._session
+
+    async def _post(self, url: str, data: dict, not_found_ok: bool = False, idempotent: bool = True) -> dict | None:
+        """
+        POSTs a form to Twilio. A timeout or dropped connection is only retryable for
+        an `idempotent` request, since Twilio may already have acted on it.
+        """
+        try:
+            async with self._get_session().post(url, data=data) as response:
+                if response.status == 404 and not_found_ok:
+                    return None
+                if response.status >= 400:
+                    detail = await response.text()
+                    raise NotificationError(
+                        f"Twilio returned {response.status}: {detail[:200]}",
+                        retryable=response.status in RETRYABLE_STATUSES,
+                    )
+                return await response.json()
+        except aiohttp.ClientConnectorError as e:
+            # The connection was never made, so Twilio hasn't seen the request
+            raise NotificationError(f"Twilio request failed: {e}", retryable=True)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise NotificationError(f"Twilio request failed: {str(e) or type(e).__name__}", retryable=idempotent)
+        except aiohttp.ClientError as e:
+            # e.g. a malformed response
+            raise NotificationError(f"Twilio request failed: {str(e) or type(e).__name__}")
+
+    async def send_sms(self, phone_number: str, message: str):
+        await self._post(
+            f"{TWILIO_API_URL}/Accounts/{self.account_sid}/Messages.json",
+            {"To": phone_number, "From": self.from_number, "Body": message},
+        )
+
+    async def send_otp(self, phone_number: str):
+        await self._post(
+            f"{TWILIO_VERIFY_URL}/Services/{self.verify_sid}/Verifications",
+            {"To": phone_number, "Channel": "sms"},
+        )
+
+    async def verify_otp(self, phone_number: str, otp_code: str) -> bool:
+        # Twilio answers 404 once the verification has expired or was already approved,
+        # so a check that may have gone through is not retried: the retry would be rejected
+        result = await self._post(
+            f"{TWILIO_VERIFY_URL}/Services/{self.verify_sid}/VerificationCheck",
+            {"To": phone_number, "Code": otp_code},
+            not_found_ok=True,
+            idempotent=False,
+        )
+        return result is not None and result.get("status") == "approved"
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class FakeBackend:
+    """
+    In-process stand-in for tests and load runs: nothing leaves the process.
+    Messages are recorded in `sent`, and OTPs are `otp_code` (random if not given).
+    `latency_seconds` simulates the provider's response time.
+    """
+    name = "fake"
+
+    def __init__(self, latency_seconds: float = 0.0, otp_code: str | None = None):
+        self.latency_seconds = latency_seconds
+        self.otp_code = otp_code
+        self.sent = []  # (phone_number, message) in send order
+        self._pending_otps = {}
+
+    async def send_sms(self, phone_number: str, message: str):
+        await asyncio.sleep(self.latency_seconds)
+        self.sent.append((phone_number, message))
+
+    async def send_otp(self, phone_number: str):
+        await asyncio.sleep(self.latency_seconds)
+        code = self.otp_code or f"{secrets.randbelow(10**6):06d}"
+        self._pending_otps[phone_number] = code
+        self.sent.append((phone_number, f"Your verification code is {code}"))
+
+    async def verify_otp(self, phone_number: str, otp_code: str) -> bool:
+        await asyncio.sleep(self.latency_seconds)
+        if self._pending_otps.get(phone_number) != otp_code:
+            return False
+        del self._pending_otps[phone_number]  # like Twilio, an approved code can't be reused
+        return True
+
+    async def close(self):
+        pass
+
+
+def create_backend(name: str):
+    if name == "twilio":
+        return TwilioBackend(
+            settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER,
+            settings.TWILIO_VERIFY_SID, settings.SMS_TIMEOUT_SECONDS, settings.SMS_POOL_SIZE,
+        )
+    if name == "fake":
+        return FakeBackend(latency_seconds=settings.SMS_FAKE_LATENCY_MS / 1000)
+    raise ValueError(f"Unknown SMS backend '{name}' (expected 'twilio' or 'fake')")
+
+
+# ===================================================================
+# Client
+# ===================================================================
+
+class NotificationClient:
+    """
+    Async SMS/OTP client: bounded retries with jittered exponential backoff on
+    transient failures, and fire-and-forget dispatch for messages nobody waits on.
+    """
+    def __init__(self, backend, max_retries: int, backoff_seconds: float = 0.2):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._loop = None
+        self._dispatched = set()  # keeps fire-and-forget tasks alive until they finish
+        self._lock = threading.Lock()
+        self._succeeded = 0
+        self._failed = 0
+        self._retries = 0
+
+    def start(self):
+        """Binds the client to the server's event loop, so dispatch() also works from threads."""
+        self._loop = asyncio.get_running_loop()
+
+    async def aclose(self, timeout: float = 10.0):
+        """Waits (up to `timeout`) for dispatched messages, then closes the backend."""
+        if self._dispatched:
+            await asyncio.wait(set(self._dispatched), timeout=timeout)
+        await self.backend.close()
+
+    async def _call(self, operation: str, func, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await func(*args)
+                self._count(succeeded=1)
+                return result
+            except NotificationError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    self._count(failed=1)
+                    raise
+                self._count(retries=1)
+                # Full jitter, so a burst of failures doesn't retry in lockstep
+                delay = random.uniform(0, self.backoff_seconds * 2 ** attempt)
+                print(f"{operation} failed ({e}); retrying in {delay * 1000:.0f} ms")
+                await asyncio.sleep(delay)
+
+    def _count(self, succeeded: int = 0, failed: int = 0, retries: int = 0):
+        with self._lock:
+            self._succeeded += succeeded
+            self._failed += failed
+            self._retries += retries
+
+    async def send_sms(self, phone_number: str, message: str) -> bool:
+        """Sends a standard SMS message to a given phone number."""
+        try:
+            await self._call("SMS", self.backend.send_sms, phone_number, message)
+            print(f"SMS sent to {phone_number}")
+            return True
+        except NotificationError as e:
+            print(f"Error sending SMS to {phone_number}: {e}")
+            return False
+
+    async def send_otp(self, phone_number: str) -> bool:
+        """Sends an OTP to the user's phone number."""
+        try:
+            await self._call("OTP", self.backend.send_otp, phone_number)
+            print(f"OTP sent to {phone_number}")
+            return True
+        except NotificationError as e:
+            print(f"Error sending OTP to {phone_number}: {e}")
+            return False
+
+    async def verify_otp(self, phone_number: str, otp_code: str) -> bool:
+        """Verifies an OTP code for a given phone number."""
+        try:
+            return await self._call("OTP check", self.backend.verify_otp, phone_number, otp_code)
+        except NotificationError as e:
+            print(f"Error verifying OTP for {phone_number}: {e}")
+            return False
+
+    def dispatch_sms(self, phone_number: str, message: str):
+        """
+        Sends an SMS in the background without waiting for it. Safe to call from the
+        event loop and from the threads sync endpoints run in.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is None:
+                raise RuntimeError("NotificationClient.start() must run before dispatching from a thread")
+            self._loop.call_soon_threadsafe(self._dispatch, phone_number, message)
+        else:
+            self._dispatch(phone_number, message)
+
+    def _dispatch(self, phone_number: str, message: str):
+        task = asyncio.get_running_loop().create_task(self.send_sms(phone_number, message))
+        self._dispatched.add(task)
+        task.add_done_callback(self._dispatched.discard)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+                "retries": self._retries,
+                "dispatched_in_flight": len(self._dispatched),
+            }
+
+
+# A single, process-wide client with one connection pool
+notification_client = NotificationClient(create_backend(settings.SMS_BACKEND), max_retries=settings.SMS_MAX_RETRIES)
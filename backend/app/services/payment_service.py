@@ -8,6 +8,26 @@ except Exception as e:
     print(f"Error initializing Razorpay client: {e}")
     razorpay_client = None
 
+def plan_amount(subscription_plan) -> int:
+    """
+    The price of a locker subscription plan, in paise.
+    """
+    return settings.LOCKER_PLAN_PRICES_PAISE[subscription_plan.value]
+
+def verify_webhook_signature(body: str, signature: str) -> bool:
+    """
+    Checks a webhook body against its X-Razorpay-Signature header (a local HMAC check).
+    """
+    if not razorpay_client:
+        print("Razorpay client not initialized. Cannot verify webhook signature.")
+        return False
+
+    try:
+        razorpay_client.utility.verify_webhook_signature(body, signature, settings.RAZORPAY_WEBHOOK_SECRET)
+        return True
+    except razorpay.errors.SignatureVerificationError:
+        return False
+
 def create_payment_link(amount: int, description: str, user_email: str, user_phone: str) -> str | None:
     """
     Creates a Razorpay payment link.
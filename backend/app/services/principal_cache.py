@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.models.user import UserStatus
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as the auth dependencies need it, without the heavy columns."""
+    id: int
+    email: str
+    full_name: str
+    phone_number: str
+    status: UserStatus
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of principals keyed by token subject (the user's email), each
+    entry valid for `ttl_seconds`.
+
+    Entries are dropped by crud_user whenever a user's status or password changes in
+    this process. Changes made by another process (e.g. a job worker) are seen once
+    the entry expires, so the TTL is the longest a stale entry can live there.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # subject -> (principal, expires_at), least recently used first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, subject: str) -> Principal | None:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, subject: str, principal: Principal):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+# A single, process-wide cache
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
@@ -1,64 +1,33 @@
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+from app.services.notification_client import notification_client
 
-from app.core.config import settings
+# Thin facade over the shared async NotificationClient, which holds the provider
+# backend, its connection pool and the retry policy.
 
-# Initialize the Twilio Client
-try:
-    twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    verify_service = twilio_client.verify.v2.services(settings.TWILIO_VERIFY_SID)
-except Exception as e:
-    print(f"Error initializing Twilio client: {e}")
-    twilio_client = None
-    verify_service = None
 
-def send_sms(phone_number: str, message: str) -> bool:
+async def send_sms(phone_number: str, message: str) -> bool:
     """
     Sends a standard SMS message to a given phone number.
     """
-    if not twilio_client:
-        print("Twilio client not initialized. Cannot send SMS.")
-        return False
-        
-    try:
-        twilio_client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
-        print(f"SMS sent to {phone_number}")
-        return True
-    except TwilioRestException as e:
-        print(f"Error sending SMS to {phone_number}: {e}")
-        return False
+    return await notification_client.send_sms(phone_number, message)
 
-def send_otp(phone_number: str) -> bool:
+
+def dispatch_sms(phone_number: str, message: str):
+    """
+    Sends an SMS in the background, for messages no request waits on.
+    Can be called from async handlers and from sync (threadpool) endpoints.
+    """
+    notification_client.dispatch_sms(phone_number, message)
+
+
+async def send_otp(phone_number: str) -> bool:
     """
-    Sends an OTP to the user's phone number using Twilio Verify.
+    Sends an OTP to the user's phone number through the configured SMS backend.
     """
-    if not verify_service:
-        print("Twilio Verify service not initialized. Cannot send OTP.")
-        return False
+    return await notification_client.send_otp(phone_number)
 
-    try:
-        verify_service.verifications.create(to=phone_number, channel='sms')
-        print(f"OTP sent to {phone_number}")
-        return True
-    except TwilioRestException as e:
-        print(f"Error sending OTP to {phone_number}: {e}")
-        return False
 
-def verify_otp(phone_number: str, otp_code: str) -> bool:
+async def verify_otp(phone_number: str, otp_code: str) -> bool:
     """
-    Verifies an OTP code for a given phone number using Twilio Verify.
+    Verifies an OTP code for a given phone number through the configured SMS backend.
     """
-    if not verify_service:
-        print("Twilio Verify service not initialized. Cannot verify OTP.")
-        return False
-        
-    try:
-        result = verify_service.verification_checks.create(to=phone_number, code=otp_code)
-        return result.status == 'approved'
-    except TwilioRestException as e:
-        print(f"Error verifying OTP for {phone_number}: {e}")
-        return False
\ No newline at end of file
+    return await notification_client.verify_otp(phone_number, otp_code)
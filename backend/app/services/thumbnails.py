@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+
+def render_thumbnail(image, size: int, quality: int) -> bytes | None:
+    """
+    Downscales an encoded image (any bytes-like object) so its longer side is at most
+    `size` pixels and re-encodes it as JPEG. None if it can't be decoded.
+    """
+    if not len(image):
+        return None  # imdecode asserts on an empty buffer
+    frame = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+
+    height, width = frame.shape[:2]
+    scale = size / max(height, width)
+    if scale < 1:
+        frame = cv2.resize(frame, (max(round(width * scale), 1), max(round(height * scale), 1)), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return None
+    return encoded.tobytes()
+
+
+class ThumbnailCache:
+    """
+    Bounded LRU cache of rendered review thumbnails, keyed by (image key, size).
+
+    Images are content-addressed and never change, so entries never go stale; the
+    endpoint looks up the user's current image key first, so a photo deleted after
+    activation stops being served even while its thumbnail is still cached here.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (image key, size) -> jpeg, least recently used first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, image_key: str, size: int) -> bytes | None:
+        with self._lock:
+            thumbnail = self._entries.get((image_key, size))
+            if thumbnail is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end((image_key, size))
+            self._hits += 1
+            return thumbnail
+
+    def put(self, image_key: str, size: int, thumbnail: bytes):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(image_key, size)] = thumbnail
+            self._entries.move_to_end((image_key, size))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": sum(len(jpeg) for jpeg in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "evictions": self._evictions,
+            }
+
+
+# A single, process-wide cache
+thumbnail_cache = ThumbnailCache(settings.PHOTO_THUMBNAIL_CACHE_SIZE)
@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mediapipe as mp
+import numpy as np
+
+from app.core.config import settings
+
+# Options for every pooled graph; identical graphs are what make them interchangeable.
+# Video mode (static_image_mode=False) tracks landmarks from frame to frame instead of
+# re-running the face detector on every frame.
+FACE_MESH_OPTIONS = dict(
+    static_image_mode=False, refine_landmarks=True, max_num_faces=1,
+    min_detection_confidence=0.5, min_tracking_confidence=0.5
+)
+
+WARMUP_FRAME_SIZE = 192
+
+
+class FaceMeshPoolExhausted(RuntimeError):
+    """Raised when no FaceMesh graph became free within the checkout timeout."""
+
+
+class FaceMeshPool:
+    """
+    A bounded pool of pre-initialized MediaPipe FaceMesh graphs.
+
+    Building a FaceMesh graph takes hundreds of milliseconds and holds native
+    resources, so graphs are built once and handed from session to session.
+    A graph is reset on return, which drops the landmark-tracking state of the
+    previous session.
+    """
+    def __init__(self, size: int, **face_mesh_options):
+        self.size = size
+        self._options = face_mesh_options or FACE_MESH_OPTIONS
+        self._idle = queue.LifoQueue()  # LIFO keeps the most recently used graphs warm
+        self._lock = threading.Lock()
+        self._closed = False
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        start = time.perf_counter()
+        for _ in range(size):
+            self._idle.put(self._create())
+        self.init_seconds = time.perf_counter() - start
+        print(f"FaceMesh pool initialized {size} graphs in {self.init_seconds * 1000:.0f} ms")
+
+    def _create(self):
+        mesh = mp.solutions.face_mesh.FaceMesh(**self._options)
+        # MediaPipe loads its TFLite models lazily; run one blank frame so the first real frame doesn't pay for it
+        mesh.process(np.zeros((WARMUP_FRAME_SIZE, WARMUP_FRAME_SIZE, 3), dtype=np.uint8))
+        mesh.reset()
+        return mesh
+
+    def acquire(self, timeout: float | None = None):
+        """
+        Checks out a graph, waiting up to `timeout` seconds for one to be returned.
+        """
+        if self._closed:
+            raise RuntimeError("FaceMesh pool is closed")
+
+        start = time.perf_counter()
+        try:
+            mesh = self._idle.get_nowait()
+            waited = False
+        except queue.Empty:
+            waited = True
+            try:
+                mesh = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._timeouts += 1
+                raise FaceMeshPoolExhausted(f"No FaceMesh graph became free within {timeout}s")
+
+        wait = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+        return mesh
+
+    def release(self, mesh):
+        """
+        Resets a graph and returns it to the pool (or closes it if the pool was closed meanwhile).
+        """
+        if self._closed:
+            mesh.close()
+            return
+        mesh.reset()
+        self._idle.put(mesh)
+
+    @contextmanager
+    def checkout(self, timeout: float | None = None):
+        mesh = self.acquire(timeout=timeout)
+        try:
+            yield mesh
+        finally:
+            self.release(mesh)
+
+    def close(self):
+        """
+        Closes all idle graphs. Graphs still checked out are closed when they are released.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def metrics(self) -> dict:
+        with self._lock:
+            available = self._idle.qsize()
+            return {
+                "size": self.size,
+                "available": available,
+                "in_use": self.size - available,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / self._waits * 1000, 2) if self._waits else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "init_ms": round(self.init_seconds * 1000, 1),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_face_mesh_pool() -> FaceMeshPool:
+    """
+    Returns this process's FaceMesh pool, building it on first use.
+    Vision worker processes each get their own pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = FaceMeshPool(settings.FACE_MESH_POOL_SIZE)
+        return _pool
+
+
+def close_face_mesh_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
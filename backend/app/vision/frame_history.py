@@ -0,0 +1,47 @@
+import numpy as np
+
+# One record per analyzed frame: 23 bytes, instead of a dict holding a reference to the decoded frame
+FRAME_METRICS_DTYPE = np.dtype([
+    ("face", np.bool_),
+    ("blink", np.bool_),
+    ("textured", np.bool_),
+    ("ear", np.float32),  # NaN when the eyes could not be measured
+    ("iris_shift", np.float32),
+    ("head_delta", np.float32),
+    ("skin_pct", np.float32),
+    ("lap_var", np.float32),
+], align=False)
+
+
+class FrameHistory:
+    """
+    Per-frame liveness metrics of one session, in a preallocated NumPy ring buffer.
+
+    Memory is fixed at `capacity` records no matter how long a client keeps streaming;
+    once full, the oldest frames are overwritten. The liveness decision itself does not
+    read the history (it keeps running counters), so this is for inspection and replays.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._records = np.zeros(capacity, dtype=FRAME_METRICS_DTYPE)
+        self.total_frames = 0  # frames seen, including those already overwritten
+
+    def append(self, metrics: dict):
+        self._records[self.total_frames % self.capacity] = tuple(
+            np.nan if metrics[field] is None else metrics[field] for field in FRAME_METRICS_DTYPE.names
+        )
+        self.total_frames += 1
+
+    def __len__(self) -> int:
+        return min(self.total_frames, self.capacity)
+
+    def records(self) -> np.ndarray:
+        """The retained records, oldest first (a copy once the buffer has wrapped around)."""
+        if self.total_frames <= self.capacity:
+            return self._records[:self.total_frames]
+        split = self.total_frames % self.capacity
+        return np.concatenate((self._records[split:], self._records[:split]))
+
+    @property
+    def nbytes(self) -> int:
+        return self._records.nbytes
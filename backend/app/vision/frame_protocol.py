@@ -0,0 +1,81 @@
+import struct
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# Binary vision frames: a fixed big-endian header followed by the encoded image.
+#
+#   offset  size  field
+#   0       1     version       (PROTOCOL_VERSION)
+#   1       1     codec         (CODEC_JPEG / CODEC_WEBP)
+#   2       1     flags         (FLAG_LANDMARKS_ONLY, ...)
+#   3       1     reserved      (0)
+#   4       4     sequence      frame counter, increasing per session
+#   8       8     timestamp_ms  capture time on the client (epoch milliseconds)
+#   16      2     width         encoded image width in pixels
+#   18      2     height        encoded image height in pixels
+#   20      ...   payload       raw JPEG/WebP bytes
+HEADER = struct.Struct(">BBBBIQHH")
+PROTOCOL_VERSION = 1
+
+CODEC_JPEG = 0
+CODEC_WEBP = 1
+CODECS = {CODEC_JPEG, CODEC_WEBP}
+
+# The frame only feeds landmark tracking (blink, iris, head motion), so it may be
+# decoded at reduced resolution and is not a candidate for texture checks or the best frame
+FLAG_LANDMARKS_ONLY = 0x01
+
+
+class FrameProtocolError(ValueError):
+    """Raised for binary messages that are not valid vision frames."""
+
+
+@dataclass
+class Frame:
+    payload: bytes | str  # encoded image bytes, or a base64 data-URL in text mode
+    sequence: int | None = None
+    timestamp_ms: int | None = None
+    width: int | None = None
+    height: int | None = None
+    codec: int = CODEC_JPEG
+    landmarks_only: bool = False
+
+
+def parse_binary_frame(message: bytes) -> Frame:
+    """
+    Splits a binary websocket message into its header fields and image payload.
+    """
+    if len(message) <= HEADER.size:
+        raise FrameProtocolError(f"Frame of {len(message)} bytes is shorter than its header")
+
+    version, codec, flags, _, sequence, timestamp_ms, width, height = HEADER.unpack_from(message)
+    if version != PROTOCOL_VERSION:
+        raise FrameProtocolError(f"Unsupported frame protocol version {version}")
+    if codec not in CODECS:
+        raise FrameProtocolError(f"Unsupported frame codec {codec}")
+
+    return Frame(
+        payload=message[HEADER.size:], sequence=sequence, timestamp_ms=timestamp_ms,
+        width=width, height=height, codec=codec, landmarks_only=bool(flags & FLAG_LANDMARKS_ONLY),
+    )
+
+
+def encode_binary_frame(image: bytes, sequence: int, timestamp_ms: int, width: int, height: int,
+                        codec: int = CODEC_JPEG, landmarks_only: bool = False) -> bytes:
+    """
+    Builds a binary frame message (what a kiosk client sends).
+    """
+    flags = FLAG_LANDMARKS_ONLY if landmarks_only else 0
+    return HEADER.pack(PROTOCOL_VERSION, codec, flags, 0, sequence, timestamp_ms, width, height) + image
+
+
+def decode_image_bytes(payload: bytes, reduced: bool = False):
+    """
+    Decodes raw JPEG/WebP bytes into a BGR image. With `reduced`, the image is decoded
+    at half resolution, which for JPEG skips most of the IDCT work.
+    Returns None if the bytes are not a readable image.
+    """
+    flags = cv2.IMREAD_REDUCED_COLOR_2 if reduced else cv2.IMREAD_COLOR
+    return cv2.imdecode(np.frombuffer(payload, np.uint8), flags)
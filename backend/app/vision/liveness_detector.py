@@ -1,92 +1,155 @@
-import cv2
-import mediapipe as mp
+import time
+
 import numpy as np
 
+from app.core.config import settings
+from app.vision.face_mesh_pool import FaceMeshPool, get_face_mesh_pool
+from app.vision.frame_history import FrameHistory
+from app.vision.pixel_pipeline import PixelPipeline, clip_box
+from app.vision.streaming_stats import P2Quantile
+
 # --- CONFIGURATION CONSTANTS (from your original script) ---
 EAR_BLINK_THRESH = 0.22
 BLINK_CONSEC_FRAMES = 2
 IRIS_MOVE_THRESH = 0.012
 HEAD_MOVE_THRESH = 0.015
 SKIN_PCT_MIN = 0.08
-LAPLACIAN_MIN = 25.0
+LAPLACIAN_MIN = 25.0 # on the face ROI normalized to LIVENESS_ROI_SIZE (see PixelPipeline)
 MIN_VALID_FRAMES = 8
 
 LEFT_EYE = [33, 160, 158, 133, 153, 144]
 RIGHT_EYE = [362, 385, 387, 263, 373, 380]
 LEFT_IRIS = [468, 469, 470, 471, 472]
 RIGHT_IRIS = [473, 474, 475, 476, 477]
+NOSE_TIP = 1
+
+# Index arrays for vectorized lookups into the (N, 2) landmark array
+EYES = np.array([LEFT_EYE, RIGHT_EYE])
+IRISES = np.array(LEFT_IRIS + RIGHT_IRIS)
 
 # --- UTILITY FUNCTIONS (from your original script) ---
 def euclid(a, b):
     return float(np.linalg.norm(np.array(a) - np.array(b)))
 
-def laplacian_var_gray(img_gray):
-    return cv2.Laplacian(img_gray, cv2.CV_64F).var()
+# Wire layout of one landmark in a serialized NormalizedLandmarkList when it carries
+# exactly x, y and z (as FaceMesh output does): field tag, length, then three tagged floats
+LANDMARK_WIRE_DTYPE = np.dtype([
+    ("tag", "u1"), ("size", "u1"),
+    ("x_tag", "u1"), ("x", "<f4"), ("y_tag", "u1"), ("y", "<f4"), ("z_tag", "u1"), ("z", "<f4"),
+])
 
-def compute_ear(lm, w, h, indices):
-    try:
-        pts = np.array([[lm[i].x * w, lm[i].y * h] for i in indices])
-        A = euclid(pts[1], pts[5])
-        B = euclid(pts[2], pts[4])
-        C = euclid(pts[0], pts[3]) + 1e-9
-        return (A + B) / (2.0 * C)
-    except:
-        return None
+def landmarks_to_array(face_landmarks, w, h):
+    """
+    Converts a FaceMesh NormalizedLandmarkList into an (N, 2) float32 array of pixel coordinates.
+
+    Reading 2 x 478 protobuf attributes from Python costs more than all the landmark math
+    of a frame, so the list is serialized in one C call and its fixed-size records are read
+    straight into NumPy. Any other layout falls back to attribute access.
+    """
+    count = len(face_landmarks.landmark)
+    data = face_landmarks.SerializeToString()
+    if len(data) == count * LANDMARK_WIRE_DTYPE.itemsize:
+        records = np.frombuffer(data, dtype=LANDMARK_WIRE_DTYPE)
+        if ((records["tag"] == 0x0A) & (records["size"] == 15) & (records["x_tag"] == 0x0D)
+                & (records["y_tag"] == 0x15) & (records["z_tag"] == 0x1D)).all():
+            pts = np.empty((count, 2), dtype=np.float32)
+            np.multiply(records["x"], w, out=pts[:, 0])
+            np.multiply(records["y"], h, out=pts[:, 1])
+            return pts
+
+    pts = np.array([(p.x, p.y) for p in face_landmarks.landmark], dtype=np.float32)
+    pts *= (w, h)
+    return pts
+
+def eye_aspect_ratios(pts):
+    """EAR of the left and right eye at once, from the (N, 2) landmark array."""
+    eyes = pts[EYES]  # (2 eyes, 6 points, xy)
+    A = np.linalg.norm(eyes[:, 1] - eyes[:, 5], axis=1)
+    B = np.linalg.norm(eyes[:, 2] - eyes[:, 4], axis=1)
+    C = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1) + 1e-9
+    return (A + B) / (2.0 * C)
 
 class LivenessDetector:
     """
     A class to detect liveness from a stream of video frames.
     It encapsulates the state and logic for a single liveness check session.
     """
-    def __init__(self):
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            refine_landmarks=True, max_num_faces=1,
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
+    def __init__(self, face_mesh_pool: FaceMeshPool | None = None,
+                 texture_every_n: int | None = None, frame_budget_ms: float | None = None):
+        # The FaceMesh graph is borrowed from a warm pool; only the detector state below is per-session
+        self._face_mesh_pool = face_mesh_pool or get_face_mesh_pool()
+        self.face_mesh = self._face_mesh_pool.acquire(timeout=settings.FACE_MESH_POOL_TIMEOUT_SECONDS)
         self.prev = {}  # State dictionary for tracking changes between frames
-        self.frames_history = []
+        # Fixed-size metrics history; of the frames themselves only the sharpest one is kept
+        self.frames_history = FrameHistory(settings.LIVENESS_HISTORY_FRAMES)
         self.best_frame_laplacian = 0.0
+        self.best_frame = None
+        self.best_face_box = None  # FaceMesh bbox (x_min, y_min, x_max, y_max) in best_frame
+        self.best_eyes = None  # eye centres in best_frame, for alignment
+        self._pixels = PixelPipeline(settings.LIVENESS_ROI_SIZE)  # reusable per-session pixel buffers
+
+        # Texture metrics (Laplacian, skin mask) only run on every n-th face frame, and are
+        # deferred to a later frame when landmark tracking already used up the frame's budget
+        self.texture_every_n = max(1, texture_every_n or settings.LIVENESS_TEXTURE_EVERY_N)
+        budget_ms = settings.LIVENESS_FRAME_BUDGET_MS if frame_budget_ms is None else frame_budget_ms
+        self.frame_budget = budget_ms / 1000
+        self.max_texture_deferrals = settings.LIVENESS_MAX_TEXTURE_DEFERRALS
+        self._frames_since_texture = None  # None until the first textured frame
+        self.texture_frames = 0
+        self.deferred_textures = 0
+
+        # Running decision state, updated on every frame so check_liveness() is O(1)
+        self.valid_frames = 0
+        self.blink_count = 0
+        self.iris_moves = 0
+        self.head_moves = 0
+        self.skin_median = P2Quantile(0.5)
+        self.lap_median = P2Quantile(0.5)
+
+    def close(self):
+        """
+        Returns the FaceMesh graph to the pool. The detector cannot analyze frames afterwards.
+        """
+        if self.face_mesh is not None:
+            self._face_mesh_pool.release(self.face_mesh)
+            self.face_mesh = None
+
+    def __enter__(self):
+        return self
 
-    def analyze_frame(self, frame):
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze_frame(self, frame, landmarks_only: bool = False):
         """
         Processes a single frame to extract liveness metrics.
+        With `landmarks_only` (e.g. a reduced-resolution frame) the skin/texture metrics
+        are skipped and the frame is never kept as the best frame.
         """
+        start = time.perf_counter()
         h, w = frame.shape[:2]
         out = {
             "face": False, "ear": None, "blink": False, "iris_shift": 0.0,
-            "head_delta": 0.0, "skin_pct": 0.0, "lap_var": 0.0, "best_frame": frame
+            "head_delta": 0.0, "skin_pct": 0.0, "lap_var": 0.0, "textured": False
         }
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb = self._pixels.to_rgb(frame)
         res = self.face_mesh.process(rgb)
         if not res.multi_face_landmarks:
             self.frames_history.append(out)
             return out
 
-        lm = res.multi_face_landmarks[0].landmark
         out["face"] = True
 
-        pts = np.array([[p.x * w, p.y * h] for p in lm])
-        x_min, y_min = int(pts[:, 0].min()), int(pts[:, 1].min())
-        x_max, y_max = int(pts[:, 0].max()), int(pts[:, 1].max())
-        face_roi = frame[y_min:y_max, x_min:x_max]
+        # All landmark metrics below are vectorized lookups into this one array
+        pts = landmarks_to_array(res.multi_face_landmarks[0], w, h)
+        x_min, y_min = pts.min(axis=0).astype(int)
+        x_max, y_max = pts.max(axis=0).astype(int)
+        face_box = clip_box((x_min, y_min, x_max, y_max), frame.shape)
 
-        if face_roi.size > 0:
-            gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-            out["lap_var"] = laplacian_var_gray(gray)
-            if out["lap_var"] > self.best_frame_laplacian:
-                self.best_frame_laplacian = out["lap_var"]
-                out["best_frame"] = frame # Store the sharpest frame
-
-            ycrcb = cv2.cvtColor(face_roi, cv2.COLOR_BGR2YCrCb)
-            skin_mask = cv2.inRange(ycrcb, (0, 133, 77), (255, 173, 127))
-            out["skin_pct"] = float((skin_mask > 0).sum()) / (skin_mask.size + 1e-9)
-
-        earL = compute_ear(lm, w, h, LEFT_EYE)
-        earR = compute_ear(lm, w, h, RIGHT_EYE)
-        if earL and earR:
-            ear = (earL + earR) / 2.0
+        ears = eye_aspect_ratios(pts)
+        if ears.all():
+            ear = float(ears.mean())
             out["ear"] = ear
             if ear < EAR_BLINK_THRESH:
                 self.prev.setdefault("closed_frames", 0)
@@ -96,33 +159,82 @@ class LivenessDetector:
                     out["blink"] = True
                 self.prev["closed_frames"] = 0
 
-        if max(LEFT_IRIS + RIGHT_IRIS) < len(lm):
-            iris_center = np.mean([[lm[i].x * w, lm[i].y * h] for i in LEFT_IRIS + RIGHT_IRIS], axis=0)
-            self.prev.setdefault("iris_prev", iris_center)
-            out["iris_shift"] = euclid(iris_center, self.prev["iris_prev"]) / max(1, (x_max - x_min))
-            self.prev["iris_prev"] = iris_center
-
-        nose = np.array([lm[1].x * w, lm[1].y * h])
-        self.prev.setdefault("nose_prev", nose)
-        out["head_delta"] = euclid(nose, self.prev["nose_prev"]) / max(1, (x_max - x_min))
-        self.prev["nose_prev"] = nose
-
+        # Landmarks jitter between decode resolutions, so motion is only measured
+        # against the previous frame of the same size (full vs reduced decodes)
+        motion_prev = self.prev.setdefault(("motion", h, w), {})
+
+        if IRISES.max() < len(pts):
+            iris_center = pts[IRISES].mean(axis=0)
+            motion_prev.setdefault("iris_prev", iris_center)
+            out["iris_shift"] = euclid(iris_center, motion_prev["iris_prev"]) / max(1, (x_max - x_min))
+            motion_prev["iris_prev"] = iris_center
+
+        nose = pts[NOSE_TIP]
+        motion_prev.setdefault("nose_prev", nose)
+        out["head_delta"] = euclid(nose, motion_prev["nose_prev"]) / max(1, (x_max - x_min))
+        motion_prev["nose_prev"] = nose
+
+        if face_box is not None and not landmarks_only and self._texture_due(start):
+            out["textured"] = True
+            self.texture_frames += 1
+            self._frames_since_texture = 0
+            out["lap_var"], out["skin_pct"] = self._pixels.texture_metrics(frame, face_box)
+            if out["lap_var"] > self.best_frame_laplacian:
+                self.best_frame_laplacian = out["lap_var"]
+                self.best_frame = frame # Store the sharpest frame
+                # ...and where the face is in it, so embedding needs no second detection pass
+                self.best_face_box = (int(x_min), int(y_min), int(x_max), int(y_max))
+                self.best_eyes = pts[EYES].mean(axis=1)
+        elif self._frames_since_texture is not None:
+            self._frames_since_texture += 1
+
+        self._update_decision_state(out)
         self.frames_history.append(out)
         return out
 
+    def _update_decision_state(self, out: dict):
+        self.valid_frames += 1
+        self.blink_count += out["blink"]
+        self.iris_moves += out["iris_shift"] > IRIS_MOVE_THRESH
+        self.head_moves += out["head_delta"] > HEAD_MOVE_THRESH
+        # Landmark-only frames carry no texture metrics and must not drag the medians down
+        if out["textured"]:
+            self.skin_median.add(out["skin_pct"])
+            self.lap_median.add(out["lap_var"])
+
+    def _texture_due(self, start: float) -> bool:
+        """
+        Whether this face frame gets the texture metrics: the first face frame always does,
+        then every n-th one, unless the frame is already over its CPU budget. After
+        `max_texture_deferrals` deferrals in a row it runs anyway, so a session on a slow
+        host still collects texture evidence.
+        """
+        if self._frames_since_texture is None:
+            return True
+        if self._frames_since_texture + 1 < self.texture_every_n:
+            return False
+        # Every frame since the texture metrics first fell due has been a deferral
+        deferrals = self._frames_since_texture + 1 - self.texture_every_n
+        if deferrals >= self.max_texture_deferrals:
+            return True
+        if self.frame_budget and time.perf_counter() - start > self.frame_budget:
+            self.deferred_textures += 1
+            return False
+        return True
+
     def check_liveness(self):
         """
-        Analyzes the accumulated frame history to make a final liveness decision.
+        Scores the session so far from the running counters and median estimates.
+        Cheap enough to call after every frame.
         """
-        valid = [f for f in self.frames_history if f["face"]]
-        if len(valid) < MIN_VALID_FRAMES:
+        if self.valid_frames < MIN_VALID_FRAMES:
             return 0, "Too few valid frames"
 
-        blink_count = sum(1 for f in valid if f["blink"])
-        iris_moves = sum(1 for f in valid if f["iris_shift"] > IRIS_MOVE_THRESH)
-        head_moves = sum(1 for f in valid if f["head_delta"] > HEAD_MOVE_THRESH)
-        skin_med = np.median([f["skin_pct"] for f in valid])
-        lap_med = np.median([f["lap_var"] for f in valid])
+        blink_count = self.blink_count
+        iris_moves = self.iris_moves
+        head_moves = self.head_moves
+        skin_med = self.skin_median.value()
+        lap_med = self.lap_median.value()
 
         score = 0
         score += 0.40 * (blink_count > 0 or iris_moves > 0)
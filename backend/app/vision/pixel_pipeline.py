@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+# YCrCb skin range used by the skin-percentage metric
+SKIN_YCRCB_LOWER = np.array([0, 133, 77], dtype=np.uint8)
+SKIN_YCRCB_UPPER = np.array([255, 173, 127], dtype=np.uint8)
+
+
+def clip_box(box, shape) -> tuple[int, int, int, int] | None:
+    """Clips an (x_min, y_min, x_max, y_max) box to a frame; None if nothing of it is inside."""
+    h, w = shape[:2]
+    x_min, y_min, x_max, y_max = box
+    x_min, y_min = max(int(x_min), 0), max(int(y_min), 0)
+    x_max, y_max = min(int(x_max), w), min(int(y_max), h)
+    if x_max <= x_min or y_max <= y_min:
+        return None
+    return x_min, y_min, x_max, y_max
+
+
+class PixelPipeline:
+    """
+    Per-session pixel work of the liveness detector, on buffers allocated once.
+
+    Texture and skin metrics are computed on the face ROI downscaled to fit in
+    `roi_size` x `roi_size`, so their cost does not grow with camera resolution,
+    and the Laplacian runs in 16-bit integers with its variance taken by meanStdDev
+    instead of a float64 Laplacian image and a NumPy .var() pass.
+
+    For faces up to `roi_size` the metrics equal the full-resolution ones. Larger faces
+    score higher than they used to: at full resolution the Laplacian variance fell
+    as the face grew, penalizing kiosks with high-resolution cameras.
+    """
+    def __init__(self, roi_size: int = 128):
+        self.roi_size = roi_size
+        self._rgb = None  # sized on the first frame (and again if the resolution changes)
+        self._roi = np.empty((roi_size, roi_size, 3), dtype=np.uint8)
+        self._gray = np.empty((roi_size, roi_size), dtype=np.uint8)
+        self._laplacian = np.empty((roi_size, roi_size), dtype=np.int16)
+        self._ycrcb = np.empty((roi_size, roi_size, 3), dtype=np.uint8)
+        self._skin_mask = np.empty((roi_size, roi_size), dtype=np.uint8)
+
+    def to_rgb(self, frame: np.ndarray) -> np.ndarray:
+        """
+        BGR to RGB into the session's reusable buffer. The result is only valid
+        until the next call (FaceMesh copies its input, so this is safe for process()).
+        """
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+    def texture_metrics(self, frame: np.ndarray, face_box) -> tuple[float, float]:
+        """
+        Laplacian variance (sharpness) and skin-pixel fraction of the face ROI,
+        for a box already clipped to the frame.
+        """
+        x_min, y_min, x_max, y_max = face_box
+        roi = frame[y_min:y_max, x_min:x_max]
+        h, w = roi.shape[:2]
+        scale = min(1.0, self.roi_size / max(h, w))
+        if scale < 1.0:
+            # Larger faces are downscaled (aspect kept); smaller ones are measured as they are,
+            # since upscaling would smooth away exactly the detail the Laplacian looks for
+            h, w = max(1, round(h * scale)), max(1, round(w * scale))
+        work = self._roi[:h, :w]
+        if scale < 1.0:
+            cv2.resize(roi, (w, h), dst=work, interpolation=cv2.INTER_LINEAR)
+        else:
+            np.copyto(work, roi)
+
+        gray, laplacian = self._gray[:h, :w], self._laplacian[:h, :w]
+        cv2.cvtColor(work, cv2.COLOR_BGR2GRAY, dst=gray)
+        cv2.Laplacian(gray, cv2.CV_16S, dst=laplacian)
+        _, std = cv2.meanStdDev(laplacian)
+        lap_var = float(std[0, 0]) ** 2
+
+        ycrcb, skin_mask = self._ycrcb[:h, :w], self._skin_mask[:h, :w]
+        cv2.cvtColor(work, cv2.COLOR_BGR2YCrCb, dst=ycrcb)
+        cv2.inRange(ycrcb, SKIN_YCRCB_LOWER, SKIN_YCRCB_UPPER, dst=skin_mask)
+        skin_pct = cv2.countNonZero(skin_mask) / (h * w)
+        return lap_var, skin_pct
@@ -0,0 +1,269 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import face_service
+from app.vision.face_mesh_pool import FaceMeshPoolExhausted, close_face_mesh_pool, get_face_mesh_pool
+from app.vision.frame_protocol import Frame, decode_image_bytes
+from app.vision.liveness_detector import LivenessDetector
+
+# ===================================================================
+# Functions executed inside the worker (each one keeps its own sessions)
+# ===================================================================
+
+# Liveness detectors of the sessions pinned to this worker, keyed by session id
+_sessions = {}
+
+
+# Warm-up timings of this worker, reported by /health/ready
+_warmup_timings = {}
+
+
+def _warm_worker() -> dict:
+    """Builds the FaceMesh graphs and the embedding model of this worker (once)."""
+    if not _warmup_timings:
+        face_mesh_pool = get_face_mesh_pool()
+        timings = face_service.load_embedding_model()
+        _warmup_timings.update(timings, face_mesh_init_ms=round(face_mesh_pool.init_seconds * 1000, 1))
+    return dict(_warmup_timings)
+
+
+def _open_session(session_id: str):
+    _sessions[session_id] = LivenessDetector()
+
+
+def _close_session(session_id: str):
+    detector = _sessions.pop(session_id, None)
+    if detector is not None:
+        detector.close()
+
+
+def _face_mesh_metrics() -> dict:
+    return get_face_mesh_pool().metrics()
+
+
+def _analyze_frame(session_id: str, frame: Frame) -> dict | None:
+    """
+    Decodes a frame and runs the liveness analysis. Returns the frame metrics and the
+    session's current score, or None if the frame is unreadable.
+    """
+    if isinstance(frame.payload, str):
+        image = face_service._decode_image(frame.payload)  # legacy text mode: base64 data-URL
+    else:
+        image = decode_image_bytes(frame.payload, reduced=frame.landmarks_only and settings.VISION_REDUCED_DECODE)
+    if image is None:
+        return None
+    detector = _sessions[session_id]
+    # Frames stay in the worker; only the scalar metrics travel back
+    metrics = detector.analyze_frame(image, landmarks_only=frame.landmarks_only)
+    # The running score comes back with every frame, so the socket can decide as soon as it passes
+    metrics["confidence"], metrics["reasons"] = detector.check_liveness()
+    return metrics
+
+
+def _check_liveness(session_id: str) -> tuple[int, str]:
+    return _sessions[session_id].check_liveness()
+
+
+def _best_face(session_id: str) -> np.ndarray | None:
+    """
+    The face to embed for this session: the aligned face crop of the sharpest frame,
+    located by FaceMesh, or the whole frame when DeepFace's own detector is used.
+    """
+    detector = _sessions[session_id]
+    if detector.best_frame is None:
+        return None
+    if not settings.EMBEDDING_SKIP_DETECTOR:
+        return detector.best_frame
+    return face_service.crop_aligned_face(detector.best_frame, detector.best_face_box, detector.best_eyes)
+
+
+def _embed_images(images: list[np.ndarray]) -> list[list[float] | None]:
+    return face_service.generate_embeddings_from_arrays(images, aligned=settings.EMBEDDING_SKIP_DETECTOR)
+
+
+# ===================================================================
+# Event-loop side
+# ===================================================================
+
+class VisionSession:
+    """
+    Handle for one websocket's liveness session. Every call is routed to the
+    same worker, which owns the session's detector state.
+    """
+    def __init__(self, pool: "VisionWorkerPool", worker: int, session_id: str):
+        self._pool = pool
+        self._worker = worker
+        self.session_id = session_id
+
+    async def analyze_frame(self, frame: Frame) -> dict | None:
+        return await self._pool._run(self._worker, _analyze_frame, self.session_id, frame)
+
+    async def check_liveness(self) -> tuple[int, str]:
+        return await self._pool._run(self._worker, _check_liveness, self.session_id)
+
+    async def best_face(self) -> np.ndarray | None:
+        return await self._pool._run(self._worker, _best_face, self.session_id)
+
+
+class VisionWorkerPool:
+    """
+    Runs MediaPipe liveness analysis and DeepFace inference off the event loop.
+
+    With VISION_WORKERS > 0 each worker is a separate process (a single-process
+    executor), and a session is pinned to one worker for its whole lifetime so its
+    detector state never has to cross process boundaries.
+    With VISION_WORKERS = 0 the work runs in the event loop's default thread pool.
+
+    Each worker admits at most FACE_MESH_POOL_SIZE sessions at a time (one per warm
+    FaceMesh graph); further sessions wait here, on the event loop, for a free slot.
+    """
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executors = []
+        self._open_sessions = []
+        self._slots = []
+        self._running_tasks = []
+        self._slot_waits = 0
+        self._slot_wait_total = 0.0
+        self._slot_wait_max = 0.0
+        self.ready = False
+        self.warmup_timings = []
+
+    def start(self):
+        if self._slots:
+            return
+        if self.workers > 0:
+            self._executors = [self._new_executor() for _ in range(self.workers)]
+            print(f"Vision worker pool started with {self.workers} processes")
+        count = max(self.workers, 1)
+        self._open_sessions = [0] * count
+        self._running_tasks = [0] * count
+        self._slots = [asyncio.Semaphore(settings.FACE_MESH_POOL_SIZE) for _ in range(count)]
+
+    async def warm_up(self):
+        """
+        Loads the FaceMesh graphs and the embedding model in every worker and
+        marks the pool ready once all of them are warm.
+        """
+        self.start()
+        start = time.perf_counter()
+        try:
+            self.warmup_timings = await asyncio.gather(
+                *(self._run(worker, _warm_worker) for worker in range(len(self._slots)))
+            )
+        except Exception as e:
+            print(f"Vision worker warm-up failed: {e}")
+            return
+        self.ready = True
+        print(f"Vision workers ready after {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._slots and not self._executors:
+            close_face_mesh_pool()
+        self._executors = []
+        self._slots = []
+        self.ready = False
+
+    @asynccontextmanager
+    async def session(self):
+        """Opens a liveness session on the least loaded worker."""
+        self.start()
+        worker = min(range(len(self._slots)), key=self._open_sessions.__getitem__)
+        self._open_sessions[worker] += 1
+        session_id = uuid.uuid4().hex
+        try:
+            await self._acquire_slot(worker)
+            try:
+                await self._run(worker, _open_session, session_id)
+                yield VisionSession(self, worker, session_id)
+            finally:
+                try:
+                    await self._run(worker, _close_session, session_id)
+                except BrokenProcessPool:
+                    pass
+                self._slots[worker].release()
+        finally:
+            self._open_sessions[worker] -= 1
+
+    async def embed_images(self, images: list[np.ndarray]) -> list[list[float] | None]:
+        """
+        Runs one batched embedding pass on the worker with the fewest tasks in flight.
+        Embedding is stateless, so unlike sessions it is not pinned to a worker.
+        """
+        self.start()
+        worker = min(range(len(self._slots)), key=lambda w: (self._running_tasks[w], self._open_sessions[w]))
+        self._running_tasks[worker] += 1
+        try:
+            return await self._run(worker, _embed_images, images)
+        finally:
+            self._running_tasks[worker] -= 1
+
+    async def metrics(self) -> dict:
+        """Session, slot-wait and per-worker FaceMesh pool metrics."""
+        workers = []
+        for worker in range(len(self._slots)):
+            workers.append({
+                "open_sessions": self._open_sessions[worker],
+                "running_tasks": self._running_tasks[worker],
+                "face_mesh_pool": await self._run(worker, _face_mesh_metrics),
+            })
+        return {
+            "processes": self.workers,
+            "slot_waits": self._slot_waits,
+            "avg_slot_wait_ms": round(self._slot_wait_total / self._slot_waits * 1000, 2) if self._slot_waits else 0.0,
+            "max_slot_wait_ms": round(self._slot_wait_max * 1000, 2),
+            "workers": workers,
+        }
+
+    async def _acquire_slot(self, worker: int):
+        slot = self._slots[worker]
+        if not slot.locked():
+            await slot.acquire()
+            return
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout=settings.FACE_MESH_POOL_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise FaceMeshPoolExhausted(
+                f"No liveness session slot became free within {settings.FACE_MESH_POOL_TIMEOUT_SECONDS}s"
+            )
+        finally:
+            wait = time.perf_counter() - start
+            self._slot_waits += 1
+            self._slot_wait_total += wait
+            self._slot_wait_max = max(self._slot_wait_max, wait)
+
+    async def _run(self, worker: int, func, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._executors[worker] if self._executors else None
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # The worker crashed (e.g. a native MediaPipe/TensorFlow fault). Replace it so
+            # later sessions keep working; sessions that lived on it are lost.
+            if self._executors[worker] is executor:
+                print(f"Vision worker {worker} crashed; restarting it")
+                self._executors[worker] = self._new_executor()
+            raise
+
+    @staticmethod
+    def _new_executor() -> ProcessPoolExecutor:
+        # 'spawn' rather than 'fork': TensorFlow and MediaPipe are not fork-safe
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_worker
+        )
+
+
+# A single, process-wide pool shared by all websocket connections
+vision_pool = VisionWorkerPool(workers=settings.VISION_WORKERS)
@@ -1,11 +1,15 @@
+import time
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-import base64
-import numpy as np
-import cv2
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
 from app.database.session import SessionLocal
-from app.vision.liveness_detector import LivenessDetector
 from app.services import face_service, sms_service
+from app.services.embedding_engine import embedding_engine
+from app.vision.face_mesh_pool import FaceMeshPoolExhausted
+from app.vision.frame_protocol import Frame, FrameProtocolError, parse_binary_frame
+from app.vision.worker_pool import vision_pool
 
 router = APIRouter()
 
@@ -18,6 +22,50 @@ def get_db():
     finally:
         db.close()
 
+async def receive_frame(websocket: WebSocket) -> Frame | None:
+    """
+    Receives the next frame in either protocol: binary frames (header + raw JPEG/WebP)
+    or, for older clients, text frames holding a base64 data-URL.
+    Returns None for a binary message that is not a valid frame.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("bytes") is not None:
+        try:
+            return parse_binary_frame(message["bytes"])
+        except FrameProtocolError as e:
+            print(f"Dropping invalid vision frame: {e}")
+            return None
+    return Frame(payload=message["text"])
+
+class LivenessWindow:
+    """
+    Measures how long a session has been observed, starting at its first analyzed frame.
+    Frames carrying a capture timestamp are timed on the client clock as well as on ours:
+    passing early needs the minimum time on both clocks (neither buffered frames arriving
+    in a burst nor inflated client timestamps can shorten it), while the window expires
+    once either clock says it is over, so a client can't hold a session open either.
+    """
+    def __init__(self):
+        self._server_start = None
+        self._client_start = None
+
+    def elapsed(self, frame: Frame) -> tuple[float, float]:
+        """Returns the (shortest, longest) observed time in seconds."""
+        now = time.monotonic()
+        if self._server_start is None:
+            self._server_start = now
+        server_elapsed = now - self._server_start
+
+        if frame.timestamp_ms is None:
+            return server_elapsed, server_elapsed
+        if self._client_start is None:
+            self._client_start = frame.timestamp_ms
+        client_elapsed = (frame.timestamp_ms - self._client_start) / 1000
+        return min(server_elapsed, client_elapsed), max(server_elapsed, client_elapsed)
+
 @router.websocket("/ws/vision/{task}")
 async def vision_websocket(websocket: WebSocket, task: str):
     """
@@ -26,60 +74,73 @@ async def vision_websocket(websocket: WebSocket, task: str):
     - task='verify': Performs a liveness check, then face verification, and sends an OTP.
     """
     await websocket.accept()
-    detector = LivenessDetector()
     db_generator = get_db()
     db = next(db_generator)
 
     try:
-        frame_count = 0
-        while True:
-            frame_count += 1
-            data = await websocket.receive_text()
-            frame = face_service._decode_image(data) # Use the decoding helper from face_service
-            
-            if frame is None:
-                continue
-
-            # Process frame for liveness metrics
-            liveness_results = detector.analyze_frame(frame)
-
-            # Check for a final decision after a certain number of frames
-            if frame_count > 60: # Approx. 3 seconds if frontend sends at 20fps
-                confidence, reasons = detector.check_liveness()
-                
-                if confidence < 85:
-                    await websocket.send_text(f"FAILURE:Liveness check failed ({confidence}%). Reasons: {reasons}")
-                    break
-
-                # --- Liveness check passed, now proceed based on the task ---
-                if task == "register":
-                    await websocket.send_text("SUCCESS:Liveness confirmed")
-                    break
-                
-                elif task == "verify":
-                    # Convert the live frame to bytes for embedding
-                    _, img_encoded = cv2.imencode('.jpg', liveness_results['best_frame'])
-                    image_bytes = img_encoded.tobytes()
-
-                    embedding = face_service.generate_embedding(image_bytes)
-                    if embedding is None:
-                        await websocket.send_text("FAILURE:Face could not be processed clearly.")
+        # Frame analysis and inference run in the vision worker pool, and the blocking
+        # DB and SMS calls in a thread, so this socket never stalls the event loop.
+        async with vision_pool.session() as session:
+            window = LivenessWindow()
+            last_sequence = -1
+            while True:
+                frame = await receive_frame(websocket)
+                if frame is None:
+                    continue
+                if frame.sequence is not None:
+                    # Late or duplicated frames add nothing to the motion analysis
+                    if frame.sequence <= last_sequence:
+                        continue
+                    last_sequence = frame.sequence
+
+                # Process frame for liveness metrics; the session's running score comes back with them
+                liveness_results = await session.analyze_frame(frame)
+                if liveness_results is None:
+                    continue
+
+                # Decide as soon as the score passes (after a minimum observation time),
+                # or fail once the time window is over
+                observed, expired_after = window.elapsed(frame)
+                confidence, reasons = liveness_results["confidence"], liveness_results["reasons"]
+                passed = confidence >= settings.LIVENESS_PASS_CONFIDENCE and observed >= settings.LIVENESS_MIN_SECONDS
+                if passed or expired_after >= settings.LIVENESS_WINDOW_SECONDS:
+                    if not passed:
+                        await websocket.send_text(f"FAILURE:Liveness check failed ({confidence}%). Reasons: {reasons}")
+                        break
+
+                    # --- Liveness check passed, now proceed based on the task ---
+                    if task == "register":
+                        await websocket.send_text("SUCCESS:Liveness confirmed")
+                        break
+
+                    elif task == "verify":
+                        # The face crop located by FaceMesh goes straight to the embedding model,
+                        # batched together with the other sessions finishing liveness right now
+                        best_face = await session.best_face()
+                        embedding = await embedding_engine.embed(best_face) if best_face is not None else None
+                        if embedding is None:
+                            await websocket.send_text("FAILURE:Face could not be processed clearly.")
+                            break
+
+                        matching_user = await run_in_threadpool(
+                            face_service.find_matching_user, db, target_embedding=embedding
+                        )
+                        if matching_user:
+                            await sms_service.send_otp(matching_user.phone_number)
+                            await websocket.send_text("SUCCESS:Verification successful. OTP has been sent to your mobile.")
+                        else:
+                            await websocket.send_text("FAILURE:User not recognized.")
                         break
 
-                    matching_user = face_service.find_matching_user(db, target_embedding=embedding)
-                    if matching_user:
-                        sms_service.send_otp(matching_user.phone_number)
-                        await websocket.send_text("SUCCESS:Verification successful. OTP has been sent to your mobile.")
                     else:
-                        await websocket.send_text("FAILURE:User not recognized.")
-                    break
-                
-                else:
-                    await websocket.send_text("FAILURE:Invalid task specified.")
-                    break
-    
+                        await websocket.send_text("FAILURE:Invalid task specified.")
+                        break
+
     except WebSocketDisconnect:
         print("Client disconnected from vision websocket.")
+    except FaceMeshPoolExhausted as e:
+        print(f"Vision websocket rejected: {e}")
+        await websocket.send_text("FAILURE:The verification service is busy. Please try again shortly.")
     except Exception as e:
         print(f"An error occurred in the vision websocket: {e}")
         try:
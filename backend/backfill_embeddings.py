@@ -0,0 +1,224 @@
+"""
+Generates face embeddings for many users at once, across a pool of processes.
+
+By default it embeds every active user whose uploaded image is still waiting to be
+embedded (image_key set, no face_embedding). With --all it re-embeds every active
+user that still has an image, e.g. after switching models. Applicants that aren't
+active yet are left alone: admins review their photos, and finalize_face_embedding
+embeds them on activation. As that does, images are deleted from the image store
+once embedded unless --keep-images is given.
+
+Progress is checkpointed after every committed chunk; an interrupted run continues
+where it stopped with --resume.
+
+    python backfill_embeddings.py --workers 4
+    python backfill_embeddings.py --all --keep-images --resume
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.crud import crud_user
+from app.models.user import User, UserStatus
+from app.services import face_service
+from app.services.image_store import image_store
+from app.services.embedding_codec import embedding_to_bytes
+
+# Chunks fetched and queued ahead of the one being committed, so workers never wait on the DB
+PREFETCH_CHUNKS = 2
+
+
+def _pending_filter(all_users: bool):
+    # Only active users: pending applicants still need their photo for admin review
+    if all_users:
+        return (User.image_key.isnot(None), User.status == UserStatus.ACTIVE)
+    return (User.image_key.isnot(None), User.face_embedding.is_(None), User.status == UserStatus.ACTIVE)
+
+
+def count_users(db, all_users: bool, after_id: int) -> int:
+    return db.scalar(select(func.count(User.id)).where(*_pending_filter(all_users), User.id > after_id))
+
+
+def fetch_chunk(db, all_users: bool, after_id: int, chunk_size: int) -> list[tuple[int, str]]:
+    """The next `chunk_size` (user id, image key) pairs after `after_id`, by id."""
+    rows = db.execute(
+        select(User.id, User.image_key)
+        .where(*_pending_filter(all_users), User.id > after_id)
+        .order_by(User.id)
+        .limit(chunk_size)
+    )
+    return [(row[0], row[1]) for row in rows]
+
+
+def read_image(image_key: str) -> bytes | None:
+    try:
+        return image_store.read(image_key)
+    except FileNotFoundError:
+        print(f"Image {image_key} is missing from the image store")
+        return None
+
+
+def load_checkpoint(path: str, all_users: bool) -> dict:
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["all_users"] != all_users:
+        raise SystemExit(f"{path} belongs to a run {'with' if checkpoint['all_users'] else 'without'} --all")
+    # Checkpoints written before the count was kept: assume an --all run replaced some
+    checkpoint.setdefault("overwritten", int(checkpoint["all_users"]))
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Written to a temporary file and renamed, so an interruption never leaves half a checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def finish(checkpoint_path: str, checkpoint: dict):
+    """Removes the checkpoint and, if embeddings were replaced, the persisted gallery index."""
+    os.remove(checkpoint_path)
+    print(f"Backfill complete: {checkpoint['embedded']} embedded, {len(checkpoint['failed_ids'])} without a usable face.")
+    if checkpoint["failed_ids"]:
+        print(f"Users without a usable face: {checkpoint['failed_ids']}")
+    if checkpoint["overwritten"] and settings.FACE_INDEX_PATH and os.path.exists(settings.FACE_INDEX_PATH):
+        # The persisted gallery index holds the replaced embeddings; drop it so it is rebuilt
+        os.remove(settings.FACE_INDEX_PATH)
+        print(f"Removed {settings.FACE_INDEX_PATH}; restart the API so the face gallery is rebuilt.")
+    elif checkpoint["overwritten"]:
+        print("Existing embeddings were replaced; restart the API so the face gallery is rebuilt.")
+
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def backfill_embeddings(args):
+    """
+    Streams users in id order, embeds each chunk across the process pool, and commits
+    the chunk's embeddings in one transaction before checkpointing its last id.
+    """
+    checkpoint = {"all_users": args.all, "last_id": 0, "embedded": 0, "overwritten": 0, "failed_ids": []}
+    if args.resume and os.path.exists(args.checkpoint):
+        checkpoint = load_checkpoint(args.checkpoint, args.all)
+        print(f"Resuming after user id {checkpoint['last_id']} "
+              f"({checkpoint['embedded']} embedded, {len(checkpoint['failed_ids'])} failed so far)")
+    elif os.path.exists(args.checkpoint):
+        print(f"Starting over; {args.checkpoint} will be replaced (use --resume to continue from it)")
+
+    db = SessionLocal()
+    try:
+        total = count_users(db, args.all, checkpoint["last_id"])
+        if not total:
+            print("No users to embed.")
+            if args.resume and os.path.exists(args.checkpoint):
+                # Interrupted after its last chunk was committed
+                finish(args.checkpoint, checkpoint)
+            return
+        print(f"--- Embedding {total} users with {args.workers} workers ---")
+
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(args.workers, mp_context=context, initializer=face_service.load_embedding_model)
+        try:
+            in_flight = deque()  # (user ids, inference futures) per chunk, in id order
+            next_id = checkpoint["last_id"]
+            done, start = 0, time.perf_counter()
+
+            while True:
+                while len(in_flight) < PREFETCH_CHUNKS + 1:
+                    chunk = fetch_chunk(db, args.all, next_id, args.chunk_size)
+                    if not chunk:
+                        break
+                    next_id = chunk[-1][0]
+                    ids = [user_id for user_id, _ in chunk]
+                    keys = [image_key for _, image_key in chunk]
+                    images = [read_image(key) for key in keys]
+                    readable = [i for i, image in enumerate(images) if image is not None]
+                    futures = [
+                        pool.submit(face_service.generate_embeddings_batch, [images[i] for i in readable[j:j + args.batch_size]])
+                        for j in range(0, len(readable), args.batch_size)
+                    ]
+                    in_flight.append((ids, keys, readable, futures))
+                if not in_flight:
+                    break
+
+                ids, keys, readable, futures = in_flight.popleft()
+                embeddings = [None] * len(ids)  # users whose image is missing count as failed
+                results = (embedding for future in futures for embedding in future.result())
+                for i, embedding in zip(readable, results):
+                    embeddings[i] = embedding
+                values, cleared_keys = [], []
+                for user_id, image_key, embedding in zip(ids, keys, embeddings):
+                    if embedding is None:
+                        checkpoint["failed_ids"].append(user_id)
+                        continue
+                    value = {"id": user_id, "face_embedding": embedding_to_bytes(embedding)}
+                    if not args.keep_images:
+                        value["image_key"] = None
+                        cleared_keys.append(image_key)
+                    values.append(value)
+                if values:
+                    if args.all:
+                        checkpoint["overwritten"] += db.scalar(select(func.count(User.id)).where(
+                            User.id.in_([value["id"] for value in values]), User.face_embedding.isnot(None)
+                        ))
+                    db.execute(update(User), values)  # one executemany UPDATE by primary key
+                    # Lets a running API's face gallery notice the new embeddings on its next sync
+                    db.execute(
+                        update(User)
+                        .where(User.id.in_([value["id"] for value in values]))
+                        .values(face_embedding_version=User.face_embedding_version + 1)
+                    )
+                db.commit()
+                if cleared_keys:
+                    # Identical photos are stored once, so keep any another user still refers to
+                    referenced = crud_user.get_referenced_image_keys(db, cleared_keys)
+                    for image_key in set(cleared_keys) - referenced:
+                        image_store.delete(image_key, min_age_seconds=settings.IMAGE_GC_GRACE_SECONDS)
+
+                checkpoint["last_id"] = ids[-1]
+                checkpoint["embedded"] += len(values)
+                save_checkpoint(args.checkpoint, checkpoint)
+
+                done += len(ids)
+                elapsed = time.perf_counter() - start
+                rate = done / elapsed
+                print(f"{done}/{total} users ({len(values)}/{len(ids)} embedded in this chunk), "
+                      f"{rate:.1f} faces/sec, ETA {format_eta((total - done) / rate)}")
+        except KeyboardInterrupt:
+            # Chunks not committed yet are redone on --resume, so queued work is dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise SystemExit(f"Interrupted after user id {checkpoint['last_id']}; continue with --resume")
+        pool.shutdown()
+    finally:
+        db.close()
+
+    finish(args.checkpoint, checkpoint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Re-embed every user that still has an image")
+    parser.add_argument("--keep-images", action="store_true", help="Keep the images after embedding them")
+    parser.add_argument("--workers", type=int, default=max(os.cpu_count() or 1, 1), help="Inference processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Users fetched and committed together")
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_MAX_BATCH_SIZE,
+                        help="Images per inference call")
+    parser.add_argument("--checkpoint", default="backfill_embeddings.checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    backfill_embeddings(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput of login and unlock credential checks, and what registration saves.
+
+Simulates bursts of --requests concurrent logins (password verification) and unlocks
+(PIN verification) on one event loop, for each --workers size of the hashing pool,
+and reports checks/sec, per-check latency, and the longest stall of the event loop.
+The "inline" row verifies on the event loop itself, as the endpoints used to in
+async handlers: throughput is the same, but the loop stalls for the whole burst.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.credential_hashing --requests 32 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import bcrypt
+
+from app.core.config import settings
+from app.services.hashing import PASSWORD, PIN, UNSET_HASH, CredentialHasher
+
+HEARTBEAT_SECONDS = 0.005
+
+
+async def heartbeat(stop: asyncio.Event) -> float:
+    """Longest gap between ticks that should be HEARTBEAT_SECONDS apart: how long the loop stalled."""
+    worst, last = 0.0, time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        now = time.perf_counter()
+        worst, last = max(worst, now - last - HEARTBEAT_SECONDS), now
+    return worst
+
+
+async def burst(check, requests: int) -> tuple[float, list[float], float]:
+    """Runs `requests` concurrent checks; returns wall time, per-check latencies and the worst loop stall."""
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(HEARTBEAT_SECONDS * 2)
+
+    async def timed():
+        start = time.perf_counter()
+        valid, _ = await check()
+        assert valid
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    stop.set()
+    return wall, latencies, await monitor
+
+
+def report(label: str, requests: int, wall: float, latencies: list[float], stall: float):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  {label:<22}{requests / wall:>10.1f}{statistics.median(latencies) * 1000:>10.0f}"
+          f"{p95 * 1000:>10.0f}{stall * 1000:>14.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32, help="Concurrent checks per burst")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Hashing pool sizes to test")
+    args = parser.parse_args()
+
+    rounds = {PASSWORD: settings.PASSWORD_HASH_ROUNDS, PIN: settings.PIN_HASH_ROUNDS}
+    password_hash = bcrypt.hashpw(b"correct horse battery", bcrypt.gensalt(rounds[PASSWORD])).decode()
+    pin_hash = bcrypt.hashpw(b"123456", bcrypt.gensalt(rounds[PIN])).decode()
+
+    start = time.perf_counter()
+    bcrypt.hashpw(str(2 ** 127).encode(), bcrypt.gensalt(rounds[PIN]))
+    placeholder_ms = (time.perf_counter() - start) * 1000
+    print(f"Registration: placeholder PIN hash {placeholder_ms:.0f} ms -> sentinel {UNSET_HASH!r} 0 ms\n")
+
+    for purpose, secret, hashed in (("login", "correct horse battery", password_hash), ("unlock", "123456", pin_hash)):
+        kind = PASSWORD if purpose == "login" else PIN
+        print(f"{purpose} ({args.requests} concurrent, {rounds[kind]} rounds)")
+        print(f"  {'mode':<22}{'checks/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'loop stall ms':>14}")
+
+        async def inline():
+            return bcrypt.checkpw(secret.encode(), hashed.encode()), None
+        report("inline (event loop)", args.requests, *await burst(inline, args.requests))
+
+        for workers in args.workers:
+            hasher = CredentialHasher(rounds, max_workers=workers)
+            report(f"hasher, {workers} workers", args.requests,
+                   *await burst(lambda: hasher.verify_and_update(kind, secret, hashed), args.requests))
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Recall-vs-latency report for the approximate (IVF) face index against the exact scan.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.face_index_report --users 200000 --dim 4096 --nlist 1024
+    python -m benchmarks.face_index_report --from-db   # use the enrolled embeddings instead
+
+Queries are stored embeddings with added noise, which mimics a fresh capture of an
+enrolled user at the locker. Recall@1 is the fraction of queries for which the IVF
+index returns the same best user as the exact scan.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.face_index import ExactIndex, IVFIndex, normalize
+
+
+def synthetic_embeddings(users: int, dim: int, clusters: int, spread: float, seed: int) -> np.ndarray:
+    """Clustered random vectors; real face embeddings are far from uniform on the sphere."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    members = rng.integers(0, clusters, users)
+    return normalize(centers[members] + spread * rng.standard_normal((users, dim)).astype(np.float32))
+
+
+def db_embeddings() -> np.ndarray:
+    from app.crud import crud_user
+    from app.database.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        chunks = [vectors for _, vectors in crud_user.iter_active_face_embeddings(db)]
+    finally:
+        db.close()
+    return normalize(np.concatenate(chunks))
+
+
+def time_queries(search, queries: np.ndarray) -> tuple[list, np.ndarray]:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ids, _ = search(query)
+        latencies.append(time.perf_counter() - start)
+        results.append(int(ids[0]) if len(ids) else -1)
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=1.0, help="Spread of users around their cluster centre")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.7, help="Query noise relative to the embedding norm")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--from-db", action="store_true", help="Use the active users' embeddings from the database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = db_embeddings() if args.from_db else synthetic_embeddings(
+        args.users, args.dim, args.clusters, args.spread, args.seed
+    )
+    users, dim = vectors.shape
+    ids = np.arange(1, users + 1)
+    rng = np.random.default_rng(args.seed + 1)
+    picked = rng.choice(users, min(args.queries, users), replace=False)
+    noise = rng.standard_normal((len(picked), dim)).astype(np.float32) * (args.noise / np.sqrt(dim))
+    queries = normalize(vectors[picked] + noise)
+
+    print(f"Gallery: {users} users x {dim} dims, {len(queries)} queries")
+
+    exact = ExactIndex(dim)
+    exact.build(ids, vectors)
+    truth, exact_ms = time_queries(lambda q: exact.search(q, k=1), queries)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(dim, nlist=args.nlist)
+    ivf.build(ids, vectors)
+    print(f"IVF build (k-means, {len(ivf.centroids)} lists): {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'index':<14}{'recall@1':>10}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>10}")
+    print(f"{'exact':<14}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.2f}{np.percentile(exact_ms, 99):>10.2f}{1.0:>10.1f}")
+    for nprobe in args.nprobe:
+        if nprobe > len(ivf.centroids):
+            break
+        found, ivf_ms = time_queries(lambda q: ivf.search(q, k=1, nprobe=nprobe), queries)
+        recall = np.mean(np.array(found) == np.array(truth))
+        speedup = np.percentile(exact_ms, 50) / max(np.percentile(ivf_ms, 50), 1e-9)
+        print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{np.percentile(ivf_ms, 50):>10.2f}"
+              f"{np.percentile(ivf_ms, 99):>10.2f}{speedup:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-frame cost of LivenessDetector.analyze_frame without MediaPipe inference.
+
+FaceMesh is run once on the image and its landmarks are replayed for every frame, so
+the timings cover only our own per-frame work: colour conversion, landmark metrics,
+and (on sampled frames) the texture metrics. The landmark and texture stages are also
+timed on their own against their former implementations (per-landmark Python loops;
+full-resolution ROI with a float64 Laplacian), to keep regressions visible.
+
+The image is rescaled to each --widths camera width, since the former texture stage
+grew with resolution. Landmarks are normalized, so the replayed ones fit every scale.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.liveness_frame_cost --image face.jpg --frames 2000 --widths 640 1280 1920
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.vision.face_mesh_pool import FaceMeshPool
+from app.vision.liveness_detector import (
+    IRISES, LEFT_EYE, NOSE_TIP, RIGHT_EYE, LivenessDetector, eye_aspect_ratios, landmarks_to_array
+)
+from app.vision.pixel_pipeline import PixelPipeline, clip_box
+
+
+class ReplayFaceMesh:
+    """Stands in for a FaceMesh graph and returns one precomputed result for every frame."""
+    def __init__(self, result):
+        self.result = result
+
+    def process(self, rgb):
+        return self.result
+
+
+class ReplayPool:
+    """The minimal FaceMeshPool interface LivenessDetector needs, around a ReplayFaceMesh."""
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+    def acquire(self, timeout=None):
+        return self.mesh
+
+    def release(self, mesh):
+        pass
+
+
+def legacy_landmark_metrics(lm, w, h):
+    """The landmark stage as it was: Python loops over lm[i].x / lm[i].y."""
+    def ear(indices):
+        pts = np.array([[lm[i].x * w, lm[i].y * h] for i in indices])
+        A = np.linalg.norm(pts[1] - pts[5])
+        B = np.linalg.norm(pts[2] - pts[4])
+        C = np.linalg.norm(pts[0] - pts[3]) + 1e-9
+        return (A + B) / (2.0 * C)
+
+    pts = np.array([[p.x * w, p.y * h] for p in lm])
+    bbox = int(pts[:, 0].min()), int(pts[:, 1].min()), int(pts[:, 0].max()), int(pts[:, 1].max())
+    iris = np.mean([[lm[i].x * w, lm[i].y * h] for i in IRISES], axis=0)
+    nose = np.array([lm[NOSE_TIP].x * w, lm[NOSE_TIP].y * h])
+    return bbox, (ear(LEFT_EYE) + ear(RIGHT_EYE)) / 2.0, iris, nose
+
+
+def landmark_metrics(face_landmarks, w, h):
+    """The landmark stage as analyze_frame runs it now."""
+    pts = landmarks_to_array(face_landmarks, w, h)
+    bbox = (*pts.min(axis=0).astype(int), *pts.max(axis=0).astype(int))
+    return bbox, float(eye_aspect_ratios(pts).mean()), pts[IRISES].mean(axis=0), pts[NOSE_TIP]
+
+
+def legacy_texture_metrics(frame, face_box):
+    """The texture stage as it was: full-resolution ROI, fresh arrays, float64 Laplacian."""
+    x_min, y_min, x_max, y_max = face_box
+    face_roi = frame[y_min:y_max, x_min:x_max]
+    lap_var = cv2.Laplacian(cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var()
+    skin_mask = cv2.inRange(cv2.cvtColor(face_roi, cv2.COLOR_BGR2YCrCb), (0, 133, 77), (255, 173, 127))
+    return lap_var, float((skin_mask > 0).sum()) / (skin_mask.size + 1e-9)
+
+
+def time_per_call(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True, help="A JPEG with a face")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--widths", type=int, nargs="+", default=[640, 1280, 1920], help="Camera widths to test")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    if image is None:
+        raise SystemExit(f"Could not read {args.image}")
+
+    pool = FaceMeshPool(size=1)
+    with pool.checkout() as mesh:
+        result = mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    pool.close()
+    if not result.multi_face_landmarks:
+        raise SystemExit(f"No face found in {args.image}")
+    face_landmarks = result.multi_face_landmarks[0]
+    lm = face_landmarks.landmark
+    replay = ReplayPool(ReplayFaceMesh(result))
+    pixels = PixelPipeline(settings.LIVENESS_ROI_SIZE)
+
+    print(f"{len(lm)} landmarks, {args.frames} iterations per stage\n")
+    for width in args.widths:
+        frame = cv2.resize(image, (width, round(image.shape[0] * width / image.shape[1])))
+        h, w = frame.shape[:2]
+        pts = landmarks_to_array(face_landmarks, w, h)
+        face_box = clip_box((*pts.min(axis=0), *pts.max(axis=0)), frame.shape)
+
+        print(f"{w}x{h} frame, {face_box[2] - face_box[0]}x{face_box[3] - face_box[1]} face ROI")
+        print(f"  {'stage':<40}{'us/frame':>10}")
+        stages = [
+            ("landmark metrics (legacy loops)", lambda: legacy_landmark_metrics(lm, w, h)),
+            ("landmark metrics (vectorized)", lambda: landmark_metrics(face_landmarks, w, h)),
+            ("texture metrics (legacy full-res ROI)", lambda: legacy_texture_metrics(frame, face_box)),
+            (f"texture metrics ({pixels.roi_size}px ROI)", lambda: pixels.texture_metrics(frame, face_box)),
+        ]
+        for every_n in (1, 3):
+            detector = LivenessDetector(replay, texture_every_n=every_n, frame_budget_ms=0)
+            stages.append((f"analyze_frame (texture every {every_n})", lambda d=detector: d.analyze_frame(frame)))
+        for label, func in stages:
+            print(f"  {label:<40}{time_per_call(func, args.frames):>10.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Memory retained per liveness session.
+
+Opens --sessions concurrent LivenessDetectors, streams --frames decoded frames into
+each, and reports the Python/NumPy memory still held (measured with tracemalloc)
+while all sessions are open, per session and in total. Run it with a growing
+--frames to check that a session's footprint stays flat however long a client streams.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.liveness_memory --image face.jpg --sessions 4 --frames 60 600
+"""
+import argparse
+import gc
+import tracemalloc
+
+import cv2
+
+from app.vision.face_mesh_pool import FaceMeshPool
+from app.vision.liveness_detector import LivenessDetector
+
+
+def measure(pool: FaceMeshPool, encoded: bytes, sessions: int, frames: int) -> int:
+    """Bytes still allocated after streaming `frames` frames into each of `sessions` open detectors."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    detectors = [LivenessDetector(pool) for _ in range(sessions)]
+    for _ in range(frames):
+        for detector in detectors:
+            # Every frame is decoded afresh, as it is when it arrives over the socket
+            detector.analyze_frame(cv2.imdecode(encoded, cv2.IMREAD_COLOR))
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    for detector in detectors:
+        detector.close()
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True, help="A JPEG with a face, sent as every frame")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--frames", type=int, nargs="+", default=[60, 600])
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    if image is None:
+        raise SystemExit(f"Could not read {args.image}")
+    ok, encoded = cv2.imencode(".jpg", image)
+    print(f"{args.sessions} concurrent sessions, {image.shape[1]}x{image.shape[0]} frames "
+          f"({image.nbytes / 1024:.0f} KiB decoded)\n")
+    print(f"{'frames':>8}{'per session KiB':>18}{'total KiB':>12}")
+
+    pool = FaceMeshPool(size=args.sessions)
+    for frames in args.frames:
+        retained = measure(pool, encoded, args.sessions, frames)
+        print(f"{frames:>8}{retained / args.sessions / 1024:>18.1f}{retained / 1024:>12.1f}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Replays recorded liveness sessions through LivenessDetector at different texture
+sampling rates, to see what LIVENESS_TEXTURE_EVERY_N costs in accuracy and saves in CPU.
+
+A recorded session is either a video file or a directory of frame images (replayed in
+file-name order). Every session is first run with texture metrics on every frame; that
+run is the reference the sampled runs are compared against:
+  - pass:      whether the session passed (confidence >= --threshold)
+  - conf:      final liveness confidence
+  - ms/frame:  analyze_frame time, FaceMesh included, frame decoding excluded
+  - textured:  frames that got the Laplacian/skin metrics
+
+The summary reports, per sampling rate, how many sessions got a different pass/fail
+decision than the reference and the mean absolute confidence difference.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.liveness_replay recordings/*.mp4 recordings/kiosk-3/ --every 1 2 3 5
+"""
+import argparse
+import os
+import time
+
+import cv2
+
+from app.vision.face_mesh_pool import FaceMeshPool
+from app.vision.liveness_detector import LivenessDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_session(path: str) -> list:
+    """Decodes every frame of a recorded session up front, so decoding stays out of the timings."""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        frames = [cv2.imread(os.path.join(path, name)) for name in names]
+        return [frame for frame in frames if frame is not None]
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def replay(pool: FaceMeshPool, frames: list, every_n: int, budget_ms: float) -> dict:
+    with LivenessDetector(pool, texture_every_n=every_n, frame_budget_ms=budget_ms) as detector:
+        start = time.perf_counter()
+        for frame in frames:
+            detector.analyze_frame(frame)
+        elapsed = time.perf_counter() - start
+        confidence, _ = detector.check_liveness()
+        return {
+            "confidence": confidence,
+            "ms_per_frame": elapsed / len(frames) * 1000,
+            "textured": detector.texture_frames,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sessions", nargs="+", help="Video files or directories of frames")
+    parser.add_argument("--every", type=int, nargs="+", default=[2, 3, 5], help="Texture sampling rates to compare")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Per-frame CPU budget (0 = none)")
+    parser.add_argument("--threshold", type=int, default=85, help="Confidence needed to pass")
+    args = parser.parse_args()
+
+    rates = [1] + [n for n in args.every if n != 1]
+    pool = FaceMeshPool(size=1)
+    flips = {n: 0 for n in rates}
+    confidence_diff = {n: 0.0 for n in rates}
+    cost = {n: 0.0 for n in rates}
+    replayed = 0
+
+    print(f"{'session':<32}{'every':>6}{'pass':>6}{'conf':>6}{'ms/frame':>10}{'textured':>10}")
+    for path in args.sessions:
+        frames = load_session(path)
+        if not frames:
+            print(f"{path}: no readable frames, skipped")
+            continue
+        replayed += 1
+
+        reference = None
+        for n in rates:
+            result = replay(pool, frames, n, args.budget_ms)
+            passed = result["confidence"] >= args.threshold
+            if reference is None:
+                reference = result
+            flips[n] += passed != (reference["confidence"] >= args.threshold)
+            confidence_diff[n] += abs(result["confidence"] - reference["confidence"])
+            cost[n] += result["ms_per_frame"]
+            textured = f"{result['textured']}/{len(frames)}"
+            print(f"{os.path.basename(path.rstrip('/')):<32}{n:>6}{'yes' if passed else 'no':>6}"
+                  f"{result['confidence']:>6}{result['ms_per_frame']:>10.2f}{textured:>10}")
+    pool.close()
+
+    if not replayed:
+        return
+    print(f"\n{'every':>6}{'decision flips':>16}{'mean |conf diff|':>18}{'mean ms/frame':>15}")
+    for n in rates:
+        print(f"{n:>6}{flips[n]:>10}/{replayed:<5}{confidence_diff[n] / replayed:>18.1f}{cost[n] / replayed:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
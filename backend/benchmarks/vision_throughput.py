@@ -0,0 +1,112 @@
+"""
+Concurrent-session throughput of the vision websocket pipeline.
+
+Simulates N kiosks streaming frames at once and compares:
+  - inline: frames analyzed directly on the event loop (the old vision_ws behaviour)
+  - pool:   frames analyzed through VisionWorkerPool with the given number of processes
+
+Besides frames/sec it reports the worst event-loop lag seen by a heartbeat task,
+which is what every other socket and HTTP request on the worker experiences.
+
+Frames are sent as base64 data-URLs (--protocol text) or as binary frames
+(--protocol binary); --landmarks-only flags binary frames for reduced decoding.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.vision_throughput --image face.jpg --sessions 8 --workers 4
+"""
+import argparse
+import asyncio
+import base64
+import time
+
+import cv2
+
+from app.vision.face_mesh_pool import FaceMeshPool
+from app.vision.frame_protocol import Frame, encode_binary_frame, parse_binary_frame
+from app.vision.liveness_detector import LivenessDetector
+from app.vision.worker_pool import VisionWorkerPool, _analyze_frame, _sessions
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    """Measures how late a 10 ms timer fires while the sessions run."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+def receive(message: str | bytes) -> Frame:
+    """What the websocket handler does with each incoming message."""
+    return parse_binary_frame(message) if isinstance(message, bytes) else Frame(payload=message)
+
+
+async def inline_session(message: str | bytes, frames: int):
+    # The old handler built a fresh FaceMesh graph for every connection
+    session_id = f"inline-{id(asyncio.current_task())}"
+    _sessions[session_id] = LivenessDetector(FaceMeshPool(size=1))
+    try:
+        for _ in range(frames):
+            _analyze_frame(session_id, receive(message))
+            await asyncio.sleep(0)  # the old handler awaited receive_text() between frames
+    finally:
+        _sessions.pop(session_id).close()
+
+
+async def pool_session(pool: VisionWorkerPool, message: str | bytes, frames: int):
+    async with pool.session() as session:
+        for _ in range(frames):
+            await session.analyze_frame(receive(message))
+
+
+async def run(label: str, make_session, sessions: int, frames: int):
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(make_session() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    max_lag = max(lags) * 1000 if lags else elapsed * 1000
+    print(f"{label:<22}{sessions * frames / elapsed:>12.1f}{max_lag:>16.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", required=True, help="A JPEG with a face, sent as every frame")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--protocol", choices=["text", "binary"], default="text")
+    parser.add_argument("--landmarks-only", action="store_true", help="Flag binary frames for reduced decoding")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    ok, encoded = cv2.imencode(".jpg", image) if image is not None else (False, None)
+    if not ok:
+        raise SystemExit(f"Could not read {args.image}")
+    if args.protocol == "binary":
+        height, width = image.shape[:2]
+        data = encode_binary_frame(encoded.tobytes(), sequence=0, timestamp_ms=0, width=width, height=height,
+                                   landmarks_only=args.landmarks_only)
+    else:
+        data = "data:image/jpeg;base64," + base64.b64encode(encoded.tobytes()).decode()
+
+    print(f"{args.sessions} concurrent sessions x {args.frames} frames, {args.protocol} protocol "
+          f"({len(data)} bytes per frame)\n")
+    print(f"{'mode':<22}{'frames/sec':>12}{'max loop lag ms':>16}")
+    await run("inline (event loop)", lambda: inline_session(data, args.frames), args.sessions, args.frames)
+
+    for workers in args.workers:
+        pool = VisionWorkerPool(workers=workers)
+        pool.start()
+        try:
+            # Spawning the workers and loading MediaPipe is a one-off cost; keep it out of the timing
+            await asyncio.gather(*(pool_session(pool, data, 1) for _ in range(workers)))
+            await run(f"pool ({workers} processes)", lambda: pool_session(pool, data, args.frames),
+                      args.sessions, args.frames)
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""
+Compares the maintained per-status user counts (USER_STATUS_COUNTERS) with a fresh
+count of the users table, and with --repair rewrites them from that count.
+
+Run it after turning USER_STATUS_COUNTERS on for a database that had it off, or
+whenever the dashboard numbers look wrong.
+
+    python check_status_counts.py
+    python check_status_counts.py --repair
+"""
+import argparse
+
+from app.crud import crud_admin
+from app.database.session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="Rewrite the counts from the recount")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = crud_admin.check_status_counters(db, repair=args.repair)
+    finally:
+        db.close()
+
+    if result["consistent"]:
+        print("User status counts are consistent.")
+        return
+    for status, counts in result["mismatches"].items():
+        print(f"{status}: counted {counts['counted']}, stored {counts['stored']}")
+    if result["repaired"]:
+        print("Counts repaired.")
+    else:
+        raise SystemExit("User status counts are inconsistent; run with --repair to fix them.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
+from app.crud import crud_admin
 from app.database.session import SessionLocal
 from app.models.user import User, UserStatus
 from app.core.config import settings
-from app.security import get_password_hash
+from app.services.hashing import PASSWORD, credential_hasher
 
 def create_admin_user():
     """
@@ -20,7 +21,7 @@ def create_admin_user():
         
         # Get the pre-defined password from settings and hash it
         password = settings.ADMIN_PASSWORD
-        hashed_password = get_password_hash(password)
+        hashed_password = credential_hasher.hash_sync(PASSWORD, password)
 
         # Create the admin user with placeholder details
         new_admin = User(
@@ -35,6 +36,7 @@ def create_admin_user():
         )
         
         db.add(new_admin)
+        crud_admin.record_status_change(db, None, UserStatus.ACTIVE)
         db.commit()
         
         print(f"Admin user '{settings.ADMIN_EMAIL}' created successfully!")
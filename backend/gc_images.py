@@ -0,0 +1,43 @@
+"""
+Deletes registration photos from the image store that no user refers to any more.
+
+Photos are normally deleted as soon as their face embedding has been generated;
+this removes the ones left behind, e.g. by a registration whose transaction
+failed after its photo was written. Photos younger than IMAGE_GC_GRACE_SECONDS
+are kept, since their registration may not have committed yet.
+
+    python gc_images.py --dry-run
+    python gc_images.py
+"""
+import argparse
+
+from app.core.config import settings
+from app.crud import crud_user
+from app.database.session import SessionLocal
+from app.services.image_store import image_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    parser.add_argument("--grace-seconds", type=float, default=settings.IMAGE_GC_GRACE_SECONDS,
+                        help="Keep unreferenced photos younger than this")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = image_store.collect_garbage(
+            lambda keys: crud_user.get_referenced_image_keys(db, keys),
+            grace_seconds=args.grace_seconds,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"Checked {result['checked']} photos in {settings.IMAGE_STORE_PATH}. {verb} {result['deleted']} "
+          f"({result['bytes_freed'] / 2**20:.1f} MB) and {result['tmp_deleted']} leftover temporary files.")
+
+
+if __name__ == "__main__":
+    main()